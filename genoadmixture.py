@@ -37,7 +37,6 @@ def prep(admix_name):
     import os
     import subprocess
     import sys
-    import shutil
     import pandas as pd
 
     # Check if folder called 'Admixture' exists, if not, create it.
@@ -98,10 +97,9 @@ def prep(admix_name):
 
     k_values = list(range(int(k_start), int(k_end)+1))
 
-    # Move files for running admixture to Admixture folder
-    shutil.copy2(admix_name + '.bed', 'Admixture')
-    shutil.copy2(admix_name + '.bim', 'Admixture')
-    shutil.copy2(admix_name + '.fam', 'Admixture')
+    # Link files for running admixture into Admixture folder, copying them only if they can't be linked.
+    import genostage
+    genostage.stage_files(admix_name, 'Admixture')
 
     # Move to Admixture directory
     os.chdir('Admixture')
@@ -0,0 +1,111 @@
+# Allele frequency check used after harmonizing with 1000G, shared by genoharmonize.local and harmonize_postprocess.py.
+# Removes SNPs with an allele frequency difference > 0.2 from all 1000G superpopulations. The differences are computed
+# as one float32 (N x 5) matrix instead of ten string columns.
+try:
+    import pandas as pd
+except (ImportError, ModuleNotFoundError):
+    import genodownload
+    genodownload.getpandas()
+    import pandas as pd
+
+try:
+    import numpy as np
+except (ImportError, ModuleNotFoundError):
+    import genodownload
+    genodownload.getnumpy()
+    import numpy as np
+
+import genolegend
+import genobed
+
+# Names of the allele frequency difference columns, in the same order as genolegend.populations.
+diff_columns = [population + '_Diff' for population in genolegend.populations]
+
+
+def allele_codes(alleles):
+    # Turn a column of alleles into the same codes genolegend uses (A=0, C=1, G=2, T=3). Anything else (indels,
+    # missing alleles) gets -1, which never matches a reference allele.
+    return pd.Categorical(alleles, categories=list(genolegend.alleles)).codes
+
+
+def dataset_frequencies(geno_name):
+    # Allele frequencies of the dataset, calculated straight from the bed file instead of with plink --freq. The
+    # frequency is of the A1 allele in the bim file. Returns the columns the allele frequency check needs.
+    bim_file = genobed.read_bim(geno_name)
+    dataset_a1_frq, dataset_a2_frq, observations = genobed.allele_frequencies(geno_name, bim=bim_file)
+    return pd.DataFrame({'CHR': bim_file['chr'], 'SNP': bim_file['snp'], 'dataset_a1': bim_file['a1'],
+                         'dataset_a2': bim_file['a2'], 'dataset_a1_frq': dataset_a1_frq,
+                         'dataset_a2_frq': dataset_a2_frq, 'position': bim_file['position']})
+
+
+def af_differences(dataset_a1, dataset_a2, dataset_a1_frq, reference_a0, reference_a1, reference_af):
+    # Allele frequency difference between the dataset and each superpopulation, as an (N x 5) float32 matrix.
+    # The AF columns in the legend file are the allele frequencies of the a1 allele in that file. If the alleles are in
+    # the same order in both datasets the dataset A1 frequency is compared, if they are flipped the dataset A2
+    # frequency is compared. If the alleles don't match either way the difference is NaN.
+    match = (dataset_a1 == reference_a1) & (dataset_a2 == reference_a0)
+    flip = (dataset_a1 == reference_a0) & (dataset_a2 == reference_a1)
+    dataset_frq = np.asarray(dataset_a1_frq, dtype=np.float32)
+    dataset_frq = np.where(match, dataset_frq, np.where(flip, 1 - dataset_frq, np.float32(np.nan)))
+    return np.abs(dataset_frq[:, np.newaxis] - np.asarray(reference_af, dtype=np.float32))
+
+
+def af_remove(differences, threshold=0.2):
+    # Remove SNPs that have allele frequency differences > threshold from all population groups. NaN differences
+    # (alleles that don't match) never count as > threshold, so those SNPs are kept.
+    return (differences > np.float32(threshold)).all(axis=1)
+
+
+def position_join(study_positions, reference_positions):
+    # Inner join between study positions and the sorted positions of a reference, using binary search so only the
+    # reference rows at study positions are touched. Returns two index arrays (study_rows, reference_rows) in study
+    # order. A study variant at a position with more than one reference row (i.e. a multi-allelic site split over
+    # several biallelic rows) gets one pair per reference row, so these collisions stay visible to the caller.
+    # The study positions are cast to the dtype of the reference positions (int32 in the legend cache), since with two
+    # dtypes searchsorted would copy the whole reference to a common one on every call. Study positions outside the
+    # range of that dtype can't be in the reference.
+    study_positions = np.asarray(study_positions)
+    reference_positions = np.asarray(reference_positions)
+    limits = np.iinfo(reference_positions.dtype)
+    in_range = (study_positions >= limits.min) & (study_positions <= limits.max)
+    cast_positions = np.where(in_range, study_positions, 0).astype(reference_positions.dtype)
+    first = np.searchsorted(reference_positions, cast_positions, side='left')
+    counts = np.where(in_range, np.searchsorted(reference_positions, cast_positions, side='right') - first, 0)
+    study_rows = np.repeat(np.arange(len(study_positions)), counts)
+    # Offset of each pair within its run of reference rows.
+    offsets = np.arange(len(study_rows)) - np.repeat(np.cumsum(counts) - counts, counts)
+    reference_rows = np.repeat(first, counts) + offsets
+    return study_rows, reference_rows
+
+
+def af_check(freq_file_with_position, legend):
+    # Run the allele frequency check on one chromosome. freq_file_with_position has the dataset alleles, frequencies
+    # and positions, legend is the cache from genolegend.load(). Returns the SNPs found in 1000G, with the allele
+    # frequency differences and an 'AF_Decision' column that says whether to keep or remove each SNP.
+
+    # Join on position to get overlap with 1000G. Only the legend rows at positions in the study are read.
+    study_rows, reference_rows = position_join(freq_file_with_position['position'].values, legend['position'])
+
+    # Only use the reference SNPs that aren't A/T or G/C SNPs with MAF > 40% in all superpopulations.
+    keep = legend['keep'][reference_rows]
+    study_rows = study_rows[keep]
+    reference_rows = reference_rows[keep]
+
+    # Put the matching rows side by side. This file contains only SNPs with matches in 1000G
+    merged_file = pd.concat([freq_file_with_position.iloc[study_rows].reset_index(drop=True),
+                             genolegend.to_frame(legend, rows=reference_rows).drop('position', axis=1)], axis=1)
+
+    differences = af_differences(allele_codes(merged_file['dataset_a1']), allele_codes(merged_file['dataset_a2']),
+                                 merged_file['dataset_a1_frq'].values, legend['a0'][reference_rows],
+                                 legend['a1'][reference_rows], legend['af'][reference_rows])
+    for j in range(0, len(diff_columns)):
+        merged_file[diff_columns[j]] = differences[:, j]
+
+    # Make new column 'AF_Decision' where you remove alleles that have allele frequency differences > 0.2 from all
+    # population groups.
+    merged_file['AF_Decision'] = np.where(af_remove(differences), 'Remove', 'Keep')
+
+    # Drop duplicate SNPs. This includes SNPs that matched more than one reference row at the same position.
+    merged_file.drop_duplicates(subset=['SNP'], keep=False, inplace=True)
+
+    return merged_file
@@ -0,0 +1,566 @@
+# Reads plink bed/bim/fam files with numpy, so genotypes can be used without calling plink.
+# The bed file is SNP-major: after 3 magic bytes, each variant is stored as ceil(samples/4) bytes with 2 bits per
+# sample, lowest bits first. 00 = homozygous A1, 01 = missing, 10 = heterozygous, 11 = homozygous A2.
+import collections
+import contextlib
+import os
+
+try:
+    import pandas as pd
+except (ImportError, ModuleNotFoundError):
+    import genodownload
+    genodownload.getpandas()
+    import pandas as pd
+
+try:
+    import numpy as np
+except (ImportError, ModuleNotFoundError):
+    import genodownload
+    genodownload.getnumpy()
+    import numpy as np
+
+# First three bytes of every SNP-major bed file.
+bed_magic = b'\x6c\x1b\x01'
+
+# For each possible byte, the four 2-bit genotype fields it holds (256 x 4), lowest bits first.
+byte_fields = (np.arange(256)[:, np.newaxis] >> np.array([0, 2, 4, 6])) & 3
+# Number of A1 alleles for each genotype field, -1 for missing.
+dosage_table = np.array([2, -1, 1, 0], dtype=np.int8)[byte_fields]
+# For each possible byte, the number of A1 alleles and non-missing genotypes in all four fields.
+a1_count_table = np.where(dosage_table >= 0, dosage_table, 0).sum(axis=1)
+called_table = (dosage_table >= 0).sum(axis=1)
+
+# Chromosome codes where males only have one copy.
+haploid_x = ('23', 'X')
+
+# A dataset opened with open_plink: the bim and fam dataframes and the memory mapped bed file.
+PlinkFiles = collections.namedtuple('PlinkFiles', ['bim', 'fam', 'bed'])
+
+
+@contextlib.contextmanager
+def replacing(file_name, mode='wb'):
+    # Open a temporary file next to file_name for writing and move it over file_name once it is complete. A file
+    # already at file_name (maybe linked to another dataset's file, see genostage) is replaced instead of written into,
+    # and a file left half written by an error never takes its place.
+    temporary_name = file_name + '.' + str(os.getpid()) + '.tmp'
+    try:
+        with open(temporary_name, mode, **({} if 'b' in mode else {'newline': ''})) as f:
+            yield f
+        os.replace(temporary_name, file_name)
+    finally:
+        if os.path.exists(temporary_name):
+            os.remove(temporary_name)
+
+
+def read_bim(geno_name):
+    # Read a bim file into a pandas dataframe with named, typed columns.
+    return pd.read_csv(geno_name + '.bim', sep='\s+', header=None,
+                       names=['chr', 'snp', 'cm', 'position', 'a1', 'a2'],
+                       dtype={'chr': str, 'snp': str, 'cm': float, 'position': np.int64, 'a1': str, 'a2': str})
+
+
+def read_fam(geno_name):
+    # Read a fam file into a pandas dataframe with named, typed columns. Sex is 1 = male, 2 = female, 0 = unknown.
+    return pd.read_csv(geno_name + '.fam', sep='\s+', header=None,
+                       names=['fid', 'iid', 'father', 'mother', 'sex', 'phenotype'],
+                       dtype={'fid': str, 'iid': str, 'father': str, 'mother': str, 'sex': np.int8,
+                              'phenotype': str})
+
+
+def open_bed(geno_name, n_variants, n_samples):
+    # Memory map the genotypes of a bed file as a (variants x bytes per variant) array of bytes. Checks the magic bytes
+    # and that the file has exactly the bytes the bim and fam files say it should.
+    with open(geno_name + '.bed', 'rb') as f:
+        if f.read(3) != bed_magic:
+            raise ValueError(geno_name + '.bed is not a SNP-major plink bed file')
+    bytes_per_variant = (n_samples + 3) // 4
+    if os.path.getsize(geno_name + '.bed') != 3 + n_variants * bytes_per_variant:
+        raise ValueError(geno_name + '.bed does not have ' + str(n_variants) + ' variants and ' + str(n_samples)
+                         + ' samples like its bim and fam files')
+    if n_variants * bytes_per_variant == 0:
+        return np.zeros((n_variants, bytes_per_variant), dtype=np.uint8)
+    return np.memmap(geno_name + '.bed', dtype=np.uint8, mode='r', offset=3, shape=(n_variants, bytes_per_variant))
+
+
+def open_plink(geno_name):
+    # Read the bim and fam files of geno_name and memory map its bed file, without reading any genotypes yet.
+    bim = read_bim(geno_name)
+    fam = read_fam(geno_name)
+    return PlinkFiles(bim, fam, open_bed(geno_name, len(bim), len(fam)))
+
+
+def dosages(bed, n_samples, variants=None, samples=None):
+    # Decode rows of a memory mapped bed file to an int8 (variants x samples) array of A1 allele counts (2, 1, 0 or -1
+    # for missing), through dosage_table. variants is a slice, an array of row numbers or a boolean mask (default
+    # every row), samples an array of sample numbers or a boolean mask (default everyone). Only the bytes of those
+    # rows are read.
+    if variants is None:
+        variants = slice(None)
+    elif not isinstance(variants, slice):
+        variants = np.asarray(variants)
+        if variants.dtype == bool:
+            variants = np.flatnonzero(variants)
+    block = np.asarray(bed[variants])
+    dosage = dosage_table[block].reshape(len(block), -1)[:, :n_samples]
+    if samples is not None:
+        samples = np.asarray(samples)
+        dosage = dosage[:, np.flatnonzero(samples) if samples.dtype == bool else samples]
+    return dosage
+
+
+def iter_dosages(bed, n_samples, variants=None, samples=None, block_size=20000):
+    # Decode a memory mapped bed file block by block, so only block_size variants are in memory at once. Yields the
+    # row numbers of each block and its dosages (see dosages()).
+    rows = np.arange(len(bed)) if variants is None else np.asarray(variants)
+    if rows.dtype == bool:
+        rows = np.flatnonzero(rows)
+    for start in range(0, len(rows), block_size):
+        block_rows = rows[start:start + block_size]
+        # A run of consecutive rows is read as a slice, which is a plain view of the memory map.
+        if len(block_rows) > 0 and block_rows[-1] - block_rows[0] == len(block_rows) - 1:
+            yield block_rows, dosages(bed, n_samples, slice(block_rows[0], block_rows[-1] + 1), samples)
+        else:
+            yield block_rows, dosages(bed, n_samples, block_rows, samples)
+
+
+def allele_frequencies(geno_name, bim=None, fam=None, block_size=20000):
+    # Calculate allele frequencies like plink --freq, straight from the bed file. Returns the A1 frequency, the A2
+    # frequency and the number of non-missing allele observations for each variant in the bim file. Like plink, only
+    # founders (no father or mother in the fam file) are counted. On chrX males count as one allele, their
+    # heterozygous calls and the calls of people with unknown sex are missing. The bim and fam dataframes are read
+    # from file if they aren't given.
+    if bim is None:
+        bim = read_bim(geno_name)
+    if fam is None:
+        fam = read_fam(geno_name)
+    bed = open_bed(geno_name, len(bim), len(fam))
+    founders = ((fam['father'] == '0') & (fam['mother'] == '0')).values
+    founder_rows = np.flatnonzero(founders)
+    n_samples = len(founder_rows)
+
+    # Bytes that hold four samples each, the last byte may be padded.
+    full_bytes = n_samples // 4
+    remainder = n_samples % 4
+
+    # On chrX each person counts as 2 alleles if female, 1 if male and 0 if sex is unknown.
+    sex = fam['sex'].values[founders]
+    ploidy_x = np.where(sex == 2, 2, np.where(sex == 1, 1, 0))
+    is_x = bim['chr'].isin(haploid_x).values
+
+    a1_counts = np.zeros(len(bim), dtype=np.int64)
+    observations = np.zeros(len(bim), dtype=np.int64)
+    for start in range(0, len(bim) if n_samples > 0 else 0, block_size):
+        end = min(start + block_size, len(bim))
+        block = np.asarray(bed[start:end])
+        # Non-founders are taken out of the bytes first, so the lookup tables only see founders.
+        if n_samples < len(fam):
+            block = gather_samples(block, founder_rows)
+        block_x = is_x[start:end]
+
+        # Everything except chrX: count alleles a byte at a time with the lookup tables.
+        a1_counts[start:end] = a1_count_table[block[:, :full_bytes]].sum(axis=1)
+        observations[start:end] = 2 * called_table[block[:, :full_bytes]].sum(axis=1)
+        if remainder > 0:
+            last = dosage_table[block[:, full_bytes]][:, :remainder]
+            a1_counts[start:end] += np.where(last >= 0, last, 0).sum(axis=1)
+            observations[start:end] += 2 * (last >= 0).sum(axis=1)
+
+        # chrX: unpack every genotype and count each person by their ploidy.
+        if block_x.any():
+            dosage = dosage_table[block[block_x]].reshape(block_x.sum(), -1)[:, :n_samples]
+            called = (dosage >= 0) & ((ploidy_x == 2) | (dosage != 1))
+            a1_x = np.where(called, dosage, 0)
+            a1_x = np.where(ploidy_x == 1, a1_x // 2, a1_x)
+            a1_counts[start:end][block_x] = (a1_x * (ploidy_x > 0)).sum(axis=1)
+            observations[start:end][block_x] = (called * ploidy_x).sum(axis=1)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        a1_frq = a1_counts / observations
+    return a1_frq, 1 - a1_frq, observations
+
+
+def same_samples(geno_names):
+    # True if all the fam files are byte for byte the same, so the bed files have the same people in the same order.
+    with open(geno_names[0] + '.fam', 'rb') as f:
+        first_fam = f.read()
+    for geno_name in geno_names[1:]:
+        with open(geno_name + '.fam', 'rb') as f:
+            if f.read() != first_fam:
+                return False
+    return True
+
+
+def concatenate(geno_names, out_name, buffer_size=16 * 1024 * 1024):
+    # Join bed files that have the same people (i.e. one per chromosome) into one, without plink. For SNP-major bed
+    # files with the same fam the variants are just the genotype bytes after the magic bytes put one after the other,
+    # so the files are streamed in large blocks. Returns False without writing anything if the fam files differ, then
+    # plink --merge-list has to be used instead.
+    import shutil
+
+    if not same_samples(geno_names):
+        return False
+
+    with replacing(out_name + '.bed') as bed_out:
+        bed_out.write(bed_magic)
+        for geno_name in geno_names:
+            with open(geno_name + '.bed', 'rb') as bed_in:
+                if bed_in.read(3) != bed_magic:
+                    raise ValueError(geno_name + '.bed is not a SNP-major plink bed file')
+                shutil.copyfileobj(bed_in, bed_out, buffer_size)
+
+    with replacing(out_name + '.bim') as bim_out:
+        for geno_name in geno_names:
+            with open(geno_name + '.bim', 'rb') as bim_in:
+                shutil.copyfileobj(bim_in, bim_out, buffer_size)
+
+    copy_lines(geno_names[0] + '.fam', out_name + '.fam')
+    return True
+
+
+def genotype_counts(geno_name, bim=None, fam=None, variants=None, samples=None, block_size=20000):
+    # Count the homozygous A1, heterozygous and homozygous A2 genotypes of each variant, only using the people where
+    # samples is True and the variants where variants is True (default everyone and every variant). Missing
+    # genotypes aren't counted. Returns three arrays with one entry per selected variant.
+    if bim is None:
+        bim = read_bim(geno_name)
+    if fam is None:
+        fam = read_fam(geno_name)
+    n_samples = len(fam)
+    bed = open_bed(geno_name, len(bim), n_samples)
+    variant_rows = np.arange(len(bim)) if variants is None else np.flatnonzero(variants)
+
+    hom_a1 = np.zeros(len(variant_rows), dtype=np.int64)
+    het = np.zeros(len(variant_rows), dtype=np.int64)
+    hom_a2 = np.zeros(len(variant_rows), dtype=np.int64)
+    start = 0
+    for rows, dosage in iter_dosages(bed, n_samples, variant_rows, samples, block_size):
+        hom_a1[start:start + len(rows)] = (dosage == 2).sum(axis=1)
+        het[start:start + len(rows)] = (dosage == 1).sum(axis=1)
+        hom_a2[start:start + len(rows)] = (dosage == 0).sum(axis=1)
+        start += len(rows)
+    return hom_a1, het, hom_a2
+
+
+def extract(geno_name, out_name, variants, bim=None, fam=None, block_size=20000):
+    # Write the variants where variants is True to new bed/bim/fam files, like plink --extract but by copying their rows
+    # of the bed file. The bim lines are copied as they are.
+    subset(geno_name, out_name, variants=variants, bim=bim, fam=fam, block_size=block_size)
+
+
+# For each possible byte, the same byte with the alleles swapped: homozygous A1 (00) and homozygous A2 (11) trade
+# places in all four fields, heterozygous and missing stay. Used when a variant has its alleles the other way around.
+swap_table = np.array([sum([(3, 1, 2, 0)[(byte >> shift) & 3] << shift for shift in (0, 2, 4, 6)])
+                       for byte in range(256)], dtype=np.uint8)
+# Number of missing genotypes in all four fields of each possible byte. Padding bits are 00, so never missing.
+missing_table = (byte_fields == 1).sum(axis=1)
+# Number of fields with each 2-bit code (00, 01, 10, 11) in each possible byte, as four 16-bit lanes of a uint64.
+code_lane_shifts = np.array([0, 16, 32, 48], dtype=np.uint64)
+code_lanes = ((byte_fields[:, :, np.newaxis] == np.arange(4)).sum(axis=1).astype(np.uint64) << code_lane_shifts).sum(
+    axis=1).astype(np.uint64)
+# Bytes looked up at once by code_counts, small enough for the lookup to stay in the CPU cache.
+max_lookup = 256 * 1024
+# Masks of the low bit of every 2-bit field and of the low bit of every byte in a 64-bit word.
+low_bits = np.uint64(0x5555555555555555)
+byte_bits = np.uint64(0x0101010101010101)
+
+
+def as_words(block):
+    # Rows of bed bytes as 64-bit words of 32 people each, padding the rows with 00 fields to whole words.
+    if block.shape[1] % 8 != 0:
+        block = np.concatenate([block, np.zeros((len(block), 8 - block.shape[1] % 8), dtype=np.uint8)], axis=1)
+    return np.ascontiguousarray(block).view(np.uint64)
+
+
+def code_counts(block, n_samples):
+    # Count the fields with each code (homozygous A1, missing, heterozygous, homozygous A2) in each row of bed bytes of
+    # n_samples people. With numpy's popcount (bitwise_count) the low and high bits of every field in a word are
+    # compared at once and counted. Otherwise each byte is looked up in code_lanes, where a byte adds at most 4 to a
+    # 16-bit lane, so the lanes of up to 16383 bytes are added up at once. The 00 padding of the rows is taken off the
+    # homozygous A1 count. Returns a (4 x rows) array.
+    if hasattr(np, 'bitwise_count'):
+        words = as_words(block)
+        low = words & low_bits
+        high = (words >> np.uint64(1)) & low_bits
+        counts = np.zeros((4, len(block)), dtype=np.int64)
+        counts[1] = np.bitwise_count(low & ~high).sum(axis=1)
+        counts[2] = np.bitwise_count(high & ~low).sum(axis=1)
+        counts[3] = np.bitwise_count(low & high).sum(axis=1)
+        counts[0] = block.shape[1] * 4 - counts[1:].sum(axis=0)
+    else:
+        counts = np.zeros((4, len(block)), dtype=np.int64)
+        chunk = max(1, min(16383, max_lookup // max(len(block), 1)))
+        for start in range(0, block.shape[1], chunk):
+            summed = code_lanes[block[:, start:start + chunk]].sum(axis=1, dtype=np.uint64)
+            counts += ((summed[np.newaxis, :] >> code_lane_shifts[:, np.newaxis]) & 0xFFFF).astype(np.int64)
+    counts[0] -= block.shape[1] * 4 - n_samples
+    return counts
+
+
+def field_bits(block, genotype='missing'):
+    # Rows of bed bytes as 64-bit words (32 people each, the rows padded to whole words) with the low bit of each field
+    # set where the genotype is 'missing' (01) or 'hom' (00 or 11) and every other bit clear.
+    words = as_words(block)
+    if genotype == 'missing':
+        return words & ~(words >> np.uint64(1)) & low_bits
+    return ~(words ^ (words >> np.uint64(1))) & low_bits
+
+
+def sample_counts(block, n_samples, genotype='missing'):
+    # Count, for each of the n_samples people, the rows of bed bytes where their genotype is 'missing' or 'hom' (see
+    # field_bits), with bit operations on whole words instead of unpacking the fields. The bits of the four fields of
+    # a byte are moved to the low bit of their own byte and those bytes are added up for at most 255 rows at a time,
+    # so no byte overflows into the next.
+    bits = field_bits(block, genotype)
+    counts = np.zeros((bits.shape[1] * 8, 4), dtype=np.int64)
+    for start in range(0, len(bits), 255):
+        for field in range(4):
+            summed = ((bits[start:start + 255] >> np.uint64(2 * field)) & byte_bits).sum(axis=0, dtype=np.uint64)
+            counts[:, field] += summed.view(np.uint8)
+    return counts.ravel()[:n_samples]
+
+
+def missing_genotypes(block):
+    # Row and person numbers of the missing genotypes in rows of bed bytes. Only the words with a missing genotype in
+    # them are unpacked.
+    bits = field_bits(block)
+    # Positions in the flattened arrays are split into rows and columns after, which is faster than a 2D nonzero.
+    found = np.flatnonzero(bits)
+    rows, words = np.divmod(found, bits.shape[1])
+    fields = np.unpackbits(bits.ravel()[found].view(np.uint8), bitorder='little')[::2]
+    found = np.flatnonzero(fields)
+    return rows[found // 32], 32 * words[found // 32] + found % 32
+
+
+def pack(fields):
+    # Pack a (variants x samples) array of 2-bit genotype fields into bed bytes, four samples per byte.
+    n_rows, n_samples = fields.shape
+    padded = np.zeros((n_rows, (n_samples + 3) // 4 * 4), dtype=np.uint8)
+    padded[:, :n_samples] = fields
+    padded = padded.reshape(n_rows, -1, 4)
+    return padded[:, :, 0] | (padded[:, :, 1] << 2) | (padded[:, :, 2] << 4) | (padded[:, :, 3] << 6)
+
+
+# The 2-bit field for each number of A1 alleles, indexed by dosage + 1 (missing, 0, 1, 2). The inverse of dosage_table.
+dosage_fields = np.array([1, 3, 2, 0], dtype=np.uint8)
+
+
+def pack_dosages(dosage):
+    # Pack an int8 (variants x samples) array of A1 allele counts (-1 for missing), like dosages() returns, into bed
+    # bytes.
+    return pack(dosage_fields[dosage.astype(np.int16) + 1])
+
+
+def write_bed(out_name, dosage_blocks):
+    # Write a bed file from blocks of dosages (i.e. from iter_dosages after changing them), one block at a time.
+    with replacing(out_name + '.bed') as bed_out:
+        bed_out.write(bed_magic)
+        for dosage in dosage_blocks:
+            bed_out.write(np.ascontiguousarray(pack_dosages(dosage)).tobytes())
+
+
+def gather_samples(block, samples):
+    # Pick the 2-bit fields of the given samples (row numbers, in any order) out of rows of bed bytes and pack them
+    # again, shifting whole columns at once.
+    shifts = (2 * (samples % 4)).astype(np.uint8)
+    return pack((block[:, samples // 4] >> shifts) & 3)
+
+
+def subset(geno_name, out_name, variants=None, samples=None, bim=None, fam=None, max_missing=None, block_size=20000):
+    # Write some of the variants and/or people of geno_name to out_name without plink, like --extract, --exclude,
+    # --keep or --remove with --make-bed. variants and samples are boolean masks or arrays of row numbers (which also
+    # puts them in that order), default everything in the same order. Variants are taken by copying their rows of
+    # bytes. People are taken out of each row with gather_samples, unless everyone is kept in the same order. With
+    # max_missing, variants missing in more than that fraction of the people kept are also left out, like --geno.
+    # The bim and fam lines are copied as they are. Returns the number of variants written.
+    if bim is None:
+        bim = read_bim(geno_name)
+    if fam is None:
+        fam = read_fam(geno_name)
+    bed = open_bed(geno_name, len(bim), len(fam))
+    rows = np.arange(len(bim)) if variants is None else np.asarray(variants)
+    if rows.dtype == bool:
+        rows = np.flatnonzero(rows)
+    columns = None if samples is None else np.asarray(samples)
+    if columns is not None and columns.dtype == bool:
+        columns = np.flatnonzero(columns)
+    if columns is not None and len(columns) == len(fam) and (columns == np.arange(len(fam))).all():
+        columns = None
+    n_kept = len(fam) if columns is None else len(columns)
+
+    kept_rows = []
+    with replacing(out_name + '.bed') as bed_out:
+        bed_out.write(bed_magic)
+        for start in range(0, len(rows), block_size):
+            block_rows = rows[start:start + block_size]
+            block = np.asarray(bed[block_rows])
+            if columns is not None:
+                block = gather_samples(block, columns)
+            if max_missing is not None:
+                # Padding fields are 00 and the padding of a gathered row is too, so they never count as missing.
+                keep = missing_table[block].sum(axis=1) <= max_missing * n_kept
+                block = block[keep]
+                block_rows = block_rows[keep]
+            kept_rows.append(block_rows)
+            bed_out.write(np.ascontiguousarray(block).tobytes())
+    kept_rows = np.concatenate(kept_rows) if kept_rows else rows
+
+    copy_lines(geno_name + '.bim', out_name + '.bim', kept_rows)
+    copy_lines(geno_name + '.fam', out_name + '.fam', columns)
+    return len(kept_rows)
+
+
+def copy_lines(file_name, out_file_name, lines=None):
+    # Copy the given lines (row numbers, default all) of a text file. Lines in order are streamed, any other order
+    # reads the file into memory first.
+    import shutil
+
+    if lines is None:
+        with open(file_name, 'rb') as f_in, replacing(out_file_name) as f_out:
+            shutil.copyfileobj(f_in, f_out)
+    elif len(lines) < 2 or (np.diff(lines) > 0).all():
+        wanted = iter(lines)
+        next_line = next(wanted, None)
+        with open(file_name, 'rb') as f_in, replacing(out_file_name) as f_out:
+            for i, line in enumerate(f_in):
+                if i == next_line:
+                    f_out.write(line)
+                    next_line = next(wanted, None)
+                    if next_line is None:
+                        break
+    else:
+        with open(file_name, 'rb') as f_in:
+            all_lines = f_in.readlines()
+        with replacing(out_file_name) as f_out:
+            f_out.writelines([all_lines[i] for i in lines])
+
+
+def join_tables(file_names, out_file_name):
+    # Join text tables that all have the same header line into one, keeping the header of the first. The rows are
+    # copied as they are, so numbers keep their exact text.
+    import shutil
+
+    with replacing(out_file_name) as f_out:
+        for i, file_name in enumerate(file_names):
+            with open(file_name, 'rb') as f_in:
+                header = f_in.readline()
+                if i == 0:
+                    f_out.write(header)
+                shutil.copyfileobj(f_in, f_out)
+
+
+def write_fam(fam, out_name):
+    # Write a fam dataframe (like read_fam returns) to out_name.fam.
+    with replacing(out_name + '.fam', 'w') as fam_out:
+        fam.to_csv(fam_out, sep=' ', header=False, index=False)
+
+
+def update_fam(geno_name, out_name, fam):
+    # Write geno_name with a new fam file (i.e. updated ids, sex or parents) to out_name. The genotypes don't change,
+    # so the bed and bim files are linked instead of written again when the filesystem allows it.
+    import genostage
+
+    genostage.stage(geno_name + '.bed', out_name + '.bed', allow_symlink=False)
+    genostage.stage(geno_name + '.bim', out_name + '.bim', allow_symlink=False)
+    write_fam(fam, out_name)
+
+
+def merge_samples(geno_names, out_name, max_missing=None, block_size=20000):
+    # Merge any number of datasets with different people into one, like plink --merge-list but only keeping the
+    # variants in all of them. The bims are joined on chromosome and position and the variants are written sorted by
+    # chromosome and position, so each bed file is read once in order and the output is written block by block in one
+    # pass, instead of one rewrite per extra dataset. Alleles have to match the first dataset (in either order, '0'
+    # matches any allele); the genotypes of a dataset with its alleles the other way around are recoded with
+    # swap_table. Variants with more than max_missing missing genotypes in the merged data are left out like plink
+    # --geno. Returns False without writing anything if the same person is in more than one dataset, then plink has to
+    # be used instead.
+    import shutil
+    import genoreconcile
+
+    def same(x, y):
+        return (x == y) | (x == '0') | (y == '0')
+
+    def orders(a1, a2, other_a1, other_a2):
+        # Whether the other alleles are in the same order, and whether they are the other way around. With '0' on both
+        # sides (0/G and G/0) both orders fit one allele at a time, so the known alleles decide: they have to agree in
+        # place, or at least not agree crossed.
+        in_place = ((a1 == other_a1) & (a1 != '0')) | ((a2 == other_a2) & (a2 != '0'))
+        crossed = ((a1 == other_a2) & (a1 != '0')) | ((a2 == other_a1) & (a2 != '0'))
+        same_order = same(a1, other_a1) & same(a2, other_a2) & (in_place | ~crossed)
+        return same_order, ~same_order & same(a1, other_a2) & same(a2, other_a1)
+
+    bims = [read_bim(geno_name) for geno_name in geno_names]
+    fams = [read_fam(geno_name) for geno_name in geno_names]
+    people = pd.concat([fam['fid'] + ' ' + fam['iid'] for fam in fams])
+    if people.duplicated().any():
+        return False
+
+    # Join the variants of every dataset on chromosome and position. Positions that are in a dataset more than once
+    # can't be matched up, so they are left out.
+    both = None
+    for i, bim in enumerate(bims):
+        keys = pd.DataFrame({'chr': bim['chr'].replace(genoreconcile.chromosome_codes).values,
+                             'position': bim['position'].values, 'a1_%d' % i: bim['a1'].str.upper().values,
+                             'a2_%d' % i: bim['a2'].str.upper().values, 'row_%d' % i: np.arange(len(bim))})
+        keys = keys.drop_duplicates(['chr', 'position'], keep=False)
+        both = keys if both is None else both.merge(keys, on=['chr', 'position'])
+
+    # Alleles of the merged data start as those of the first dataset, with any '0' (monomorphic there) filled in from
+    # the next datasets. Variants whose alleles don't match are left out.
+    a1, a2 = both['a1_0'].values, both['a2_0'].values
+    matched = np.ones(len(both), dtype=bool)
+    swapped = np.zeros((len(geno_names), len(both)), dtype=bool)
+    for i in range(1, len(geno_names)):
+        other_a1, other_a2 = both['a1_%d' % i].values, both['a2_%d' % i].values
+        same_order, swapped[i] = orders(a1, a2, other_a1, other_a2)
+        matched &= same_order | swapped[i]
+        a1 = np.where(a1 == '0', np.where(swapped[i], other_a2, other_a1), a1)
+        a2 = np.where(a2 == '0', np.where(swapped[i], other_a1, other_a2), a2)
+
+    # Sort by chromosome (numbers first, in order) and position.
+    chromosome_order = pd.to_numeric(both['chr'], errors='coerce').fillna(np.inf).values
+    order = np.lexsort((both['position'].values, chromosome_order))
+    order = order[matched[order]]
+    rows = [both['row_%d' % i].values[order] for i in range(len(geno_names))]
+    swapped = swapped[:, order]
+    out_bim = bims[0].iloc[rows[0]].copy()
+    out_bim['chr'] = both['chr'].values[order]
+    out_bim['a1'] = a1[order]
+    out_bim['a2'] = a2[order]
+
+    beds = [open_bed(geno_name, len(bim), len(fam)) for geno_name, bim, fam in zip(geno_names, bims, fams)]
+    n_samples = [len(fam) for fam in fams]
+    # When every dataset but the last fills its last byte, the bytes can be put side by side as they are.
+    byte_aligned = all(n % 4 == 0 for n in n_samples[:-1])
+
+    keep = np.ones(len(order), dtype=bool)
+    with replacing(out_name + '.bed') as bed_out:
+        bed_out.write(bed_magic)
+        for start in range(0, len(order), block_size):
+            end = min(start + block_size, len(order))
+            blocks = []
+            for i, bed in enumerate(beds):
+                block = np.asarray(bed[rows[i][start:end]])
+                blocks.append(np.where(swapped[i, start:end, np.newaxis], swap_table[block], block))
+
+            if byte_aligned:
+                merged = np.hstack(blocks)
+                # Swapping also turned the padding bits of the last byte on, turn them off again.
+                if n_samples[-1] % 4 > 0:
+                    merged[:, -1] &= (1 << 2 * (n_samples[-1] % 4)) - 1
+            else:
+                merged = pack(np.hstack([byte_fields[block].reshape(end - start, -1)[:, :n].astype(np.uint8)
+                                         for block, n in zip(blocks, n_samples)]))
+
+            if max_missing is not None:
+                missing = sum(missing_table[block].sum(axis=1) for block in blocks)
+                keep[start:end] = missing <= max_missing * sum(n_samples)
+                merged = merged[keep[start:end]]
+            bed_out.write(np.ascontiguousarray(merged).tobytes())
+
+    with replacing(out_name + '.bim', 'w') as bim_out:
+        out_bim.iloc[np.flatnonzero(keep)].to_csv(bim_out, sep='\t', header=False, index=False, float_format='%g')
+    with replacing(out_name + '.fam') as fam_out:
+        for geno_name in geno_names:
+            with open(geno_name + '.fam', 'rb') as fam_in:
+                shutil.copyfileobj(fam_in, fam_out)
+    return True
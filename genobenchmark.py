@@ -0,0 +1,216 @@
+# Micro-benchmarks for the parts of the pipeline that were rewritten for speed. Each benchmark runs the old and the new
+# way on made up data, checks that they agree and prints how long each took.
+# Run with i.e. 'python genobenchmark.py afcheck'
+import time
+
+try:
+    import argparse
+except (ImportError, ModuleNotFoundError):
+    import genodownload
+    genodownload.getargparse()
+    import argparse
+
+try:
+    import pandas as pd
+except (ImportError, ModuleNotFoundError):
+    import genodownload
+    genodownload.getpandas()
+    import pandas as pd
+
+try:
+    import numpy as np
+except (ImportError, ModuleNotFoundError):
+    import genodownload
+    genodownload.getnumpy()
+    import numpy as np
+
+
+def report(name, old_seconds, new_seconds):
+    print(name + ': old ' + '%.3f' % old_seconds + 's, new ' + '%.3f' % new_seconds + 's, '
+          + '%.1f' % (old_seconds / new_seconds) + 'x faster')
+
+
+def afcheck_strings(merged_file):
+    # The allele frequency check as it was written before genoafcheck, with string columns.
+    for population in ['AFR', 'AMR', 'EAS', 'EUR', 'SAS']:
+        merged_file[population + '_Match_Diff'] = np.where(
+            (merged_file['dataset_a1'] == merged_file['reference_a1']) &
+            (merged_file['dataset_a2'] == merged_file['reference_a0']),
+            abs(merged_file['dataset_a1_frq'] - merged_file[population]), '')
+        merged_file[population + '_FlipMatch_Diff'] = np.where(
+            (merged_file['dataset_a1'] == merged_file['reference_a0']) &
+            (merged_file['dataset_a2'] == merged_file['reference_a1']),
+            abs(merged_file['dataset_a2_frq'] - merged_file[population]), '')
+        merged_file[population + '_Diff'] = pd.to_numeric(merged_file[population + '_Match_Diff']
+                                                          + merged_file[population + '_FlipMatch_Diff'],
+                                                          errors='coerce')
+    return np.where((merged_file['AFR_Diff'] > 0.2) & (merged_file['AMR_Diff'] > 0.2) &
+                    (merged_file['EAS_Diff'] > 0.2) & (merged_file['EUR_Diff'] > 0.2) &
+                    (merged_file['SAS_Diff'] > 0.2), 'Remove', 'Keep')
+
+
+def afcheck(n_variants):
+    # Allele frequency difference check on one chromosome with n_variants SNPs matched to 1000G.
+    import genoafcheck
+
+    rng = np.random.RandomState(1)
+    alleles = np.array(list('ACGT'))
+    reference_a0 = rng.randint(0, 4, n_variants)
+    reference_a1 = (reference_a0 + rng.randint(1, 4, n_variants)) % 4
+    # Most SNPs are in the same order as the reference, some are flipped and some don't match.
+    order = rng.randint(0, 10, n_variants)
+    dataset_a1 = np.where(order < 7, reference_a1, np.where(order < 9, reference_a0, (reference_a1 + 1) % 4))
+    dataset_a2 = np.where(order < 7, reference_a0, np.where(order < 9, reference_a1, (reference_a0 + 1) % 4))
+    merged_file = pd.DataFrame({'dataset_a1': alleles[dataset_a1], 'dataset_a2': alleles[dataset_a2],
+                                'dataset_a1_frq': np.round(rng.uniform(0, 1, n_variants), 4),
+                                'reference_a0': alleles[reference_a0], 'reference_a1': alleles[reference_a1]})
+    merged_file['dataset_a2_frq'] = 1 - merged_file['dataset_a1_frq']
+    reference_af = rng.uniform(0, 1, (n_variants, 5)).astype(np.float32)
+    for j in range(0, 5):
+        merged_file[['AFR', 'AMR', 'EAS', 'EUR', 'SAS'][j]] = reference_af[:, j]
+
+    start = time.time()
+    old_decision = afcheck_strings(merged_file.copy())
+    old_seconds = time.time() - start
+
+    start = time.time()
+    differences = genoafcheck.af_differences(genoafcheck.allele_codes(merged_file['dataset_a1']),
+                                             genoafcheck.allele_codes(merged_file['dataset_a2']),
+                                             merged_file['dataset_a1_frq'].values,
+                                             genoafcheck.allele_codes(merged_file['reference_a0']),
+                                             genoafcheck.allele_codes(merged_file['reference_a1']), reference_af)
+    new_decision = np.where(genoafcheck.af_remove(differences), 'Remove', 'Keep')
+    new_seconds = time.time() - start
+
+    print('AF check decisions that differ: ' + str(int((old_decision != new_decision).sum())) + ' of '
+          + str(n_variants) + ' (only possible for differences within float32 rounding of 0.2)')
+    report('AF check on ' + str(n_variants) + ' variants', old_seconds, new_seconds)
+
+
+def logparse_dataframe(log_name):
+    # Reading plink log warnings as genomerge did before genoplinklog, one dataframe row at a time.
+    logfile = pd.DataFrame()
+    with open(log_name, 'r') as f:
+        for line in f:
+            logfile = pd.concat([logfile, pd.DataFrame([tuple(line.strip().split(" "))])], ignore_index=True)
+    rsid_warnings = logfile.loc[logfile[0] == 'Warning:', 6].str.split("'", expand=True)
+    return rsid_warnings[1].dropna(how='any')
+
+
+def logparse(n_lines, old_lines=5000):
+    # Parse a made up plink merge log with n_lines lines. The old way takes time that grows with the square of the
+    # number of lines, so it only gets the first old_lines lines and is compared with the new way on those.
+    import os
+    import tempfile
+    import genoplinklog
+
+    templates = ["Warning: Multiple positions seen for variant 'rs%d'.\n",
+                 "Warning: Multiple chromosomes seen for variant 'rs%d'.\n",
+                 "Warning: Variants 'rs%d' and 'rs%d_b' have the same position.\n",
+                 "%d variants loaded from .bim file.\n"]
+
+    def write_log(log_name, lines):
+        with open(log_name, 'w') as f:
+            for i in range(0, lines):
+                template = templates[i % len(templates)]
+                f.write(template % ((i, i) if template.count('%d') == 2 else i))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        small_log = os.path.join(tmp, 'small.log')
+        write_log(small_log, min(old_lines, n_lines))
+        start = time.time()
+        old_variants = logparse_dataframe(small_log)
+        old_seconds = time.time() - start
+        start = time.time()
+        warnings = genoplinklog.read_warnings(small_log)
+        new_seconds = time.time() - start
+        # The old way only found the variant of warnings where it is the 7th word.
+        new_variants = warnings.loc[warnings['kind'].isin(['multiple_positions', 'multiple_chromosomes']), 'variant']
+        print('Warning variants that differ: ' + str(len(set(old_variants) ^ set(new_variants))))
+        report('Log parse of ' + str(min(old_lines, n_lines)) + ' lines', old_seconds, new_seconds)
+
+        big_log = os.path.join(tmp, 'big.log')
+        write_log(big_log, n_lines)
+        start = time.time()
+        warnings = genoplinklog.read_warnings(big_log)
+        print('Log parse of ' + str(n_lines) + ' lines: new ' + '%.3f' % (time.time() - start) + 's, '
+              + str(len(warnings)) + ' warnings')
+
+
+def het_dosages(geno_name, block_size=20000):
+    # Observed and expected homozygous and non-missing genotypes of each person as they were counted before genostats
+    # worked on the packed bytes, by unpacking every genotype to a dosage. Everyone is a founder.
+    import genobed
+
+    bim, fam, bed = genobed.open_plink(geno_name)
+    observed_hom = np.zeros(len(fam), dtype=np.int64)
+    expected_hom = np.zeros(len(fam), dtype=np.float64)
+    called = np.zeros(len(fam), dtype=np.int64)
+    for rows, dosage in genobed.iter_dosages(bed, len(fam), block_size=block_size):
+        hom_a1 = (dosage == 2).sum(axis=1)
+        het = (dosage == 1).sum(axis=1)
+        alleles = 2 * (hom_a1 + het + (dosage == 0).sum(axis=1))
+        p = (2 * hom_a1 + het) / alleles
+        expected = 1 - 2 * p * (1 - p) * alleles / (alleles - 1)
+        observed_hom += ((dosage == 0) | (dosage == 2)).sum(axis=0)
+        missing_rows, missing_samples = np.nonzero(dosage < 0)
+        expected_hom += expected.sum() - np.bincount(missing_samples, weights=expected[missing_rows],
+                                                     minlength=len(fam))
+        called += (dosage >= 0).sum(axis=0)
+    return observed_hom, expected_hom, called
+
+
+def het(n_variants, n_samples):
+    # Per-person heterozygosity counts on a made up autosomal dataset of n_variants SNPs and n_samples people.
+    import os
+    import tempfile
+    import genobed
+    import genostats
+
+    rng = np.random.RandomState(1)
+    with tempfile.TemporaryDirectory() as tmp:
+        geno_name = os.path.join(tmp, 'het')
+
+        def blocks():
+            for start in range(0, n_variants, 1000):
+                rows = min(1000, n_variants - start)
+                frq = rng.uniform(0.05, 0.5, (rows, 1))
+                dosage = (rng.random_sample((rows, n_samples)) < frq).astype(np.int8) + \
+                    (rng.random_sample((rows, n_samples)) < frq)
+                dosage[rng.random_sample((rows, n_samples)) < 0.01] = -1
+                yield dosage
+        genobed.write_bed(geno_name, blocks())
+        pd.DataFrame({'chr': rng.randint(1, 23, n_variants), 'snp': ['rs%d' % i for i in range(n_variants)], 'cm': 0,
+                      'position': np.arange(n_variants), 'a1': 'A', 'a2': 'G'}).to_csv(
+            geno_name + '.bim', sep='\t', header=False, index=False)
+        pd.DataFrame({'fid': np.arange(n_samples), 'iid': np.arange(n_samples), 'father': 0, 'mother': 0, 'sex': 1,
+                      'phenotype': -9}).to_csv(geno_name + '.fam', sep=' ', header=False, index=False)
+
+        start = time.time()
+        old_hom, old_expected, old_called = het_dosages(geno_name)
+        old_seconds = time.time() - start
+        start = time.time()
+        stats = genostats.scan(geno_name, geno=1)
+        new_seconds = time.time() - start
+        # Everything is on autosomes and nothing fails geno 1, so both count the same genotypes.
+        print('People with different counts: '
+              + str(((old_hom != stats['observed_hom']) | (old_called != stats['called_het']) |
+                     ~np.isclose(old_expected, stats['expected_hom'])).sum()))
+        report('Heterozygosity counts of ' + str(n_variants) + ' SNPs x ' + str(n_samples) + ' people', old_seconds,
+               new_seconds)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("benchmark", choices=['afcheck', 'logparse', 'het'], help="Which benchmark to run")
+    parser.add_argument("--variants", type=int, default=1000000, help="Number of variants to use (default 1000000)")
+    parser.add_argument("--samples", type=int, default=2000, help="Number of people to use (default 2000)")
+    parser.add_argument("--lines", type=int, default=1000000, help="Number of log lines to use (default 1000000)")
+    args = parser.parse_args()
+
+    if args.benchmark == 'afcheck':
+        afcheck(args.variants)
+    elif args.benchmark == 'logparse':
+        logparse(args.lines)
+    elif args.benchmark == 'het':
+        het(args.variants, args.samples)
@@ -0,0 +1,186 @@
+# Random access to a reference fasta file through its .fai index, used to check that SNPs are on the same strand as
+# the reference (what snpflip used to do). Works on a plain fasta file, which is memory mapped, or on a bgzip (BGZF)
+# compressed fasta with a .gzi index, where only the blocks holding the SNPs are decompressed.
+import os
+import zlib
+import struct
+
+try:
+    import pandas as pd
+except (ImportError, ModuleNotFoundError):
+    import genodownload
+    genodownload.getpandas()
+    import pandas as pd
+
+try:
+    import numpy as np
+except (ImportError, ModuleNotFoundError):
+    import genodownload
+    genodownload.getnumpy()
+    import numpy as np
+
+import genobed
+
+# Plink chromosome codes that are named differently in the 1000G fasta file.
+fasta_chromosome_names = {'23': 'X', '24': 'Y', '25': 'X', '26': 'MT', 'XY': 'X', 'M': 'MT'}
+
+
+def is_bgzf(fasta_name):
+    # A bgzip file is a gzip file whose first block has a 'BC' extra field.
+    with open(fasta_name, 'rb') as f:
+        header = f.read(16)
+    return len(header) == 16 and header[:4] == b'\x1f\x8b\x08\x04' and header[12:14] == b'BC'
+
+
+def read_block(f, compressed_offset):
+    # Decompress the BGZF block that starts at compressed_offset.
+    f.seek(compressed_offset)
+    header = f.read(18)
+    block_size = struct.unpack('<H', header[16:18])[0] + 1
+    data = header + f.read(block_size - 18)
+    return zlib.decompress(data, 31)
+
+
+def build_gzi(fasta_name):
+    # Write the .gzi index of a bgzip file by walking its block headers: for every block after the first, the
+    # compressed and uncompressed offsets where it starts.
+    offsets = []
+    compressed_offset = 0
+    uncompressed_offset = 0
+    file_size = os.path.getsize(fasta_name)
+    with open(fasta_name, 'rb') as f:
+        while compressed_offset < file_size:
+            f.seek(compressed_offset)
+            header = f.read(18)
+            block_size = struct.unpack('<H', header[16:18])[0] + 1
+            # The uncompressed size of the block is the last 4 bytes of it.
+            f.seek(compressed_offset + block_size - 4)
+            block_uncompressed = struct.unpack('<I', f.read(4))[0]
+            compressed_offset += block_size
+            uncompressed_offset += block_uncompressed
+            if compressed_offset < file_size:
+                offsets.append((compressed_offset, uncompressed_offset))
+    with open(fasta_name + '.gzi', 'wb') as f:
+        f.write(struct.pack('<Q', len(offsets)))
+        for compressed, uncompressed in offsets:
+            f.write(struct.pack('<QQ', compressed, uncompressed))
+
+
+def read_gzi(fasta_name):
+    # Returns the compressed and uncompressed starting offsets of every block, including the first one.
+    with open(fasta_name + '.gzi', 'rb') as f:
+        n_blocks = struct.unpack('<Q', f.read(8))[0]
+        offsets = np.frombuffer(f.read(16 * n_blocks), dtype='<u8').reshape(n_blocks, 2)
+    offsets = np.vstack([np.zeros((1, 2), dtype=np.uint64), offsets.astype(np.uint64)])
+    return offsets[:, 0].astype(np.int64), offsets[:, 1].astype(np.int64)
+
+
+def build_fai(fasta_name):
+    # Write the .fai index of a fasta file (plain or bgzip): name, length, offset of the first base, bases per line and
+    # bytes per line for every sequence.
+    import gzip
+
+    opener = gzip.open if fasta_name.endswith('.gz') else open
+    entries = []
+    offset = 0
+    with opener(fasta_name, 'rb') as f:
+        for line in f:
+            if line.startswith(b'>'):
+                name = line[1:].split()[0].decode()
+                entries.append([name, 0, offset + len(line), 0, 0])
+            elif entries:
+                bases = len(line.rstrip(b'\r\n'))
+                if entries[-1][3] == 0:
+                    entries[-1][3] = bases
+                    entries[-1][4] = len(line)
+                entries[-1][1] += bases
+            offset += len(line)
+    with open(fasta_name + '.fai', 'w') as f:
+        for entry in entries:
+            f.write('\t'.join(str(x) for x in entry) + '\n')
+
+
+def read_fai(fasta_name):
+    # Read the .fai index of a fasta file, building it first if it doesn't exist.
+    if not os.path.exists(fasta_name + '.fai'):
+        build_fai(fasta_name)
+    return pd.read_csv(fasta_name + '.fai', sep='\t', header=None, usecols=[0, 1, 2, 3, 4],
+                       names=['name', 'length', 'offset', 'linebases', 'linewidth'], dtype={'name': str},
+                       index_col='name')
+
+
+def reference_bases(fasta_name, chromosomes, positions):
+    # Fetch the reference base (uppercase, as a byte) at every chromosome/position pair in one batch. Positions are
+    # 1-based like in a bim file. Positions on sequences not in the fasta, or past their end, get 'N'.
+    fai = read_fai(fasta_name)
+    chromosomes = pd.Series(chromosomes, dtype=str).replace(fasta_chromosome_names)
+    positions = np.asarray(positions, dtype=np.int64)
+
+    # Byte offset of each base in the uncompressed fasta file.
+    found = chromosomes.isin(fai.index).values.copy()
+    entries = fai.reindex(chromosomes.values)
+    found &= (positions >= 1) & (positions <= entries['length'].fillna(0).values)
+    zero_based = positions[found] - 1
+    linebases = entries['linebases'].values[found].astype(np.int64)
+    offsets = (entries['offset'].values[found].astype(np.int64) + zero_based // linebases
+               * entries['linewidth'].values[found].astype(np.int64) + zero_based % linebases)
+
+    bases = np.full(len(positions), ord('N'), dtype=np.uint8)
+    if is_bgzf(fasta_name):
+        if not os.path.exists(fasta_name + '.gzi'):
+            build_gzi(fasta_name)
+        block_compressed, block_uncompressed = read_gzi(fasta_name)
+        # Decompress each block that holds a SNP once, and take all of that block's bases from it.
+        blocks = np.searchsorted(block_uncompressed, offsets, side='right') - 1
+        found_bases = np.empty(len(offsets), dtype=np.uint8)
+        with open(fasta_name, 'rb') as f:
+            for block in np.unique(blocks):
+                in_block = blocks == block
+                data = np.frombuffer(read_block(f, block_compressed[block]), dtype=np.uint8)
+                found_bases[in_block] = data[offsets[in_block] - block_uncompressed[block]]
+    else:
+        fasta = np.memmap(fasta_name, dtype=np.uint8, mode='r')
+        found_bases = fasta[offsets]
+    bases[found] = found_bases
+    # Make lowercase (soft masked) bases uppercase.
+    return np.where((bases >= ord('a')) & (bases <= ord('z')), bases - 32, bases).astype(np.uint8)
+
+
+def find_fasta(fasta_path):
+    # Find the 1000G hg19 fasta file in fasta_path. A bgzip compressed file can be read as it is, a plain gzip file
+    # has to be unzipped first. Returns None if there is no fasta file.
+    import gzip
+    import shutil
+
+    fasta_name = os.path.join(fasta_path, 'human_g1k_v37.fasta')
+    if os.path.exists(fasta_name):
+        return fasta_name
+    elif os.path.exists(fasta_name + '.gz'):
+        if is_bgzf(fasta_name + '.gz'):
+            return fasta_name + '.gz'
+        with gzip.open(fasta_name + '.gz', 'rb') as f_in, open(fasta_name, 'wb') as f_out:
+            shutil.copyfileobj(f_in, f_out)
+        return fasta_name
+    return None
+
+
+def strand_check(fasta_name, geno_name):
+    # Compare each SNP in the bim file to the reference base at its position, like snpflip. Writes the SNPs that are
+    # on the reverse strand to geno_name.reverse and the SNPs whose alleles are their own complement (A/T or C/G), so
+    # the strand can't be told, to geno_name.ambiguous. Returns the number of reverse and ambiguous SNPs.
+    bim_file = genobed.read_bim(geno_name)
+    reference = reference_bases(fasta_name, bim_file['chr'], bim_file['position'])
+    reference = pd.Series(list(reference.tobytes().decode('ascii')), index=bim_file.index)
+
+    a1 = bim_file['a1'].str.upper()
+    a2 = bim_file['a2'].str.upper()
+    a1_complement = a1.str.translate(str.maketrans('ACGT', 'TGCA'))
+    a2_complement = a2.str.translate(str.maketrans('ACGT', 'TGCA'))
+
+    ambiguous = (a1 == a2_complement) & a1.isin(['A', 'C', 'G', 'T'])
+    forward = (reference == a1) | (reference == a2)
+    reverse = ~ambiguous & ~forward & ((reference == a1_complement) | (reference == a2_complement))
+
+    bim_file.loc[reverse, 'snp'].to_csv(geno_name + '.reverse', header=False, index=False)
+    bim_file.loc[ambiguous, 'snp'].to_csv(geno_name + '.ambiguous', header=False, index=False)
+    return int(reverse.sum()), int(ambiguous.sum())
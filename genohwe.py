@@ -0,0 +1,55 @@
+# Exact test of Hardy-Weinberg equilibrium (Wigginton, Cutler and Abecasis 2005), the same test plink --hardy uses,
+# done for many variants at once with numpy instead of running plink and reading its .hwe file back.
+try:
+    import numpy as np
+except (ImportError, ModuleNotFoundError):
+    import genodownload
+    genodownload.getnumpy()
+    import numpy as np
+
+
+def hwe_exact(het, hom1, hom2, max_cells=4000000):
+    # HWE exact test p-value for each variant from its heterozygous and two homozygous genotype counts. For every
+    # variant the probability of each possible number of heterozygotes (given the number of people and of rare alleles)
+    # is calculated from log factorials. The p-value is the sum of the probabilities that are no more likely than the
+    # observed one. Variants are done in blocks with at most max_cells (variants x heterozygote counts) at a time.
+    het = np.asarray(het, dtype=np.int64)
+    hom1 = np.asarray(hom1, dtype=np.int64)
+    hom2 = np.asarray(hom2, dtype=np.int64)
+    n = het + hom1 + hom2
+    rare = np.minimum(2 * hom1 + het, 2 * hom2 + het)
+    p = np.ones(len(het))
+    if len(het) == 0:
+        return p
+
+    # log(k!) for every k that can come up.
+    log_factorial = np.concatenate([[0.0], np.cumsum(np.log(np.arange(1, 2 * n.max() + 1)))])
+
+    # Variants with similar numbers of rare alleles go in the same block, so the blocks aren't mostly padding.
+    order = np.argsort(rare, kind='stable')
+    start = 0
+    while start < len(order):
+        # Take as many variants as fit at the width of the first one, then cut back to fit the width of the last one.
+        end = min(start + max(1, max_cells // (rare[order[start]] + 1)), len(order))
+        end = start + max(1, min(end - start, max_cells // (rare[order[end - 1]] + 1)))
+        rows = order[start:end]
+        start = end
+
+        block_n = n[rows][:, np.newaxis]
+        block_rare = rare[rows][:, np.newaxis]
+        h = np.arange(rare[rows].max() + 1)[np.newaxis, :]
+        rare_hom = (block_rare - h) // 2
+        common_hom = block_n - h - rare_hom
+        # Heterozygote counts that can happen: same parity as the rare allele count and not more people than there are.
+        possible = (h <= block_rare) & ((block_rare - h) % 2 == 0) & (common_hom >= 0)
+
+        log_p = (h * np.log(2) + log_factorial[block_n] - log_factorial[np.where(possible, rare_hom, 0)]
+                 - log_factorial[h] - log_factorial[np.where(possible, common_hom, 0)] + log_factorial[block_rare]
+                 + log_factorial[2 * block_n - block_rare] - log_factorial[2 * block_n])
+        log_p = np.where(possible, log_p, -np.inf)
+        observed = log_p[np.arange(len(rows)), het[rows]][:, np.newaxis]
+        # Scale by the most likely count before leaving log space, so small probabilities don't round to 0.
+        probabilities = np.exp(log_p - log_p.max(axis=1, keepdims=True))
+        as_extreme = probabilities * (log_p <= observed + 1e-7)
+        p[rows] = np.minimum(as_extreme.sum(axis=1) / probabilities.sum(axis=1), 1.0)
+    return p
@@ -0,0 +1,193 @@
+# Preprocessed cache of the 1000G Phase 3 legend files used by the harmonization allele frequency check.
+# Each legend.gz is parsed once into a folder of typed numpy arrays (one .npy file per column) that can be memory
+# mapped, so harmonization doesn't need to re-parse the gzip text and recompute the A/T G/C decision on every run.
+import os
+import json
+import hashlib
+
+try:
+    import pandas as pd
+except (ImportError, ModuleNotFoundError):
+    import genodownload
+    genodownload.getpandas()
+    import pandas as pd
+
+try:
+    import numpy as np
+except (ImportError, ModuleNotFoundError):
+    import genodownload
+    genodownload.getnumpy()
+    import numpy as np
+
+# Names of the legend files, chr1-22 then chrX.
+legend_file_names = ['1000GP_Phase3_chr%d.legend.gz' % x for x in range(1, 23)]
+legend_file_names.extend(['1000GP_Phase3_chrX_NONPAR.legend.gz'])
+
+# Superpopulations in the legend files, in the order their allele frequencies are stored in the cache.
+populations = ['AFR', 'AMR', 'EAS', 'EUR', 'SAS']
+
+# Alleles are stored as codes, the code is the index in this string.
+alleles = 'ACGT'
+
+# Bump this when the layout of the cache changes so old caches get rebuilt.
+cache_version = 2
+
+
+def cache_dirs(legend_path, legend_file_name):
+    # Folders that can hold the cache for one legend file, i.e. Legend_Cache/1000GP_Phase3_chr1: next to the legend
+    # files, or in the working folder (Harmonized_To_1000G when harmonizing) for a shared copy of the reference that is
+    # read only, like genovcf.slice_dirs.
+    name = legend_file_name.replace('.legend.gz', '')
+    return [os.path.join(os.path.abspath(legend_path), 'Legend_Cache', name),
+            os.path.join(os.getcwd(), 'Legend_Cache', name)]
+
+
+def cache_dir(legend_path, legend_file_name):
+    # Folder a new cache is written to, made if it isn't there: the first of cache_dirs that can be written to.
+    for folder in cache_dirs(legend_path, legend_file_name):
+        try:
+            os.makedirs(folder, exist_ok=True)
+        except OSError:
+            continue
+        if os.access(folder, os.W_OK):
+            return folder
+    raise OSError('No folder to write the legend cache of ' + legend_file_name + ' to: '
+                  + ', '.join(cache_dirs(legend_path, legend_file_name)))
+
+
+def checksum(file_name):
+    # md5 of a file, read in 1MB chunks so the whole file is never in memory.
+    md5 = hashlib.md5()
+    with open(file_name, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            md5.update(chunk)
+    return md5.hexdigest()
+
+
+def current_cache(legend_path, legend_file_name):
+    # The first of cache_dirs with a cache built from a legend file with the same checksum, None if there isn't one.
+    # The size and modification time are checked first so the checksum only has to be recomputed when the legend file
+    # looks like it has changed.
+    source = os.path.join(legend_path, legend_file_name)
+    stat = os.stat(source)
+    source_md5 = None
+    for cache in cache_dirs(legend_path, legend_file_name):
+        source_json = os.path.join(cache, 'source.json')
+        if not os.path.exists(source_json):
+            continue
+
+        with open(source_json, 'r') as f:
+            source_info = json.load(f)
+        if source_info.get('version') != cache_version:
+            continue
+
+        if stat.st_size == source_info['size'] and stat.st_mtime == source_info['mtime']:
+            return cache
+
+        # Same contents with a new timestamp (i.e. copied or touched), keep the cache and remember the new timestamp
+        # if the folder can be written to.
+        if source_md5 is None:
+            source_md5 = checksum(source)
+        if source_md5 == source_info['md5']:
+            source_info['size'] = stat.st_size
+            source_info['mtime'] = stat.st_mtime
+            try:
+                with open(source_json, 'w') as f:
+                    json.dump(source_info, f)
+            except OSError:
+                pass
+            return cache
+
+    return None
+
+
+def is_current(legend_path, legend_file_name):
+    # True if one of cache_dirs has a current cache of the legend file.
+    return current_cache(legend_path, legend_file_name) is not None
+
+
+def build_file(legend_path, legend_file_name):
+    # Parse one legend file and write its cache. Returns the folder the cache is in.
+    source = os.path.join(legend_path, legend_file_name)
+    cache = cache_dir(legend_path, legend_file_name)
+
+    # Remove the old source.json first, so a half written cache is never seen as current.
+    if os.path.exists(os.path.join(cache, 'source.json')):
+        os.remove(os.path.join(cache, 'source.json'))
+
+    # Read in legend file.
+    legend_file = pd.read_csv(source, compression="gzip", sep=" ", header=0,
+                              dtype={'id': str, 'position': int, 'a0': str, 'a1': str, 'TYPE': str, 'AFR': float,
+                                     'AMR': float, 'EAS': float, 'EUR': float, 'SAS': float, 'ALL': float})
+    # Only biallelic SNPs are used in the allele frequency check.
+    legend_file = legend_file[(legend_file['TYPE'] == 'Biallelic_SNP') & legend_file['a0'].isin(list(alleles)) &
+                              legend_file['a1'].isin(list(alleles))]
+    # Positions have to be sorted so they can be searched, they already should be but make sure.
+    legend_file = legend_file.iloc[np.argsort(legend_file['position'].values, kind='mergesort')]
+
+    a0 = legend_file['a0'].map(alleles.index).values.astype(np.uint8)
+    a1 = legend_file['a1'].map(alleles.index).values.astype(np.uint8)
+    af = legend_file[populations].values.astype(np.float32)
+
+    # To Remove A/T or G/C SNPs in reference file that have an MAF > 40%, first identify which are AT/GC SNPs. With
+    # the codes above, A/T and C/G pairs are the ones that add up to 3.
+    atgc_snp = (a0.astype(np.int16) + a1) == 3
+    # MAF in each superpopulation. If the AF is less than 0.5, then that is the MAF, if not then 1-AF is MAF. This is
+    # done on the full precision frequencies so the decision is the same as it was before the cache.
+    af_full = legend_file[populations].values
+    maf = np.where(af_full < 0.5, af_full, 1 - af_full)
+    # Keep everything except ATGC SNPs where the MAF in all superpopulations is greater than 40%.
+    keep = ~(atgc_snp & (maf > 0.4).all(axis=1))
+
+    np.save(os.path.join(cache, 'id.npy'), legend_file['id'].values.astype(np.bytes_))
+    np.save(os.path.join(cache, 'position.npy'), legend_file['position'].values.astype(np.int32))
+    np.save(os.path.join(cache, 'a0.npy'), a0)
+    np.save(os.path.join(cache, 'a1.npy'), a1)
+    np.save(os.path.join(cache, 'af.npy'), af)
+    np.save(os.path.join(cache, 'af_all.npy'), legend_file['ALL'].values.astype(np.float32))
+    np.save(os.path.join(cache, 'keep.npy'), keep)
+
+    # Record which legend file this cache was built from.
+    stat = os.stat(source)
+    with open(os.path.join(cache, 'source.json'), 'w') as f:
+        json.dump({'version': cache_version, 'size': stat.st_size, 'mtime': stat.st_mtime,
+                   'md5': checksum(source)}, f)
+    return cache
+
+
+def build(legend_path):
+    # One time build step: make the cache for every legend file that doesn't have a current one.
+    for legend_file_name in legend_file_names:
+        if not is_current(legend_path, legend_file_name):
+            print('Building legend cache for ' + legend_file_name)
+            build_file(legend_path, legend_file_name)
+
+
+def load(legend_path, legend_file_name):
+    # Memory map the cached columns of one legend file, building the cache first if needed. Returns a dictionary of
+    # arrays with one entry per biallelic SNP, sorted by position: id, position (int32), a0/a1 (allele codes), af
+    # (float32, one column per superpopulation), af_all (float32) and keep (False for A/T G/C SNPs with MAF > 40% in
+    # all superpopulations).
+    cache = current_cache(legend_path, legend_file_name)
+    if cache is None:
+        cache = build_file(legend_path, legend_file_name)
+    return {column: np.load(os.path.join(cache, column + '.npy'), mmap_mode='r')
+            for column in ['id', 'position', 'a0', 'a1', 'af', 'af_all', 'keep']}
+
+
+def to_frame(legend, rows=None):
+    # Make a pandas dataframe with the same columns the allele frequency check has always used for the legend file.
+    # If rows is given, only those rows are decoded.
+    if rows is None:
+        rows = slice(None)
+    allele_names = np.array(list(alleles))
+    legend_file = pd.DataFrame({'reference_id': legend['id'][rows].astype(str),
+                                'position': legend['position'][rows].astype(np.int64),
+                                'reference_a0': allele_names[legend['a0'][rows]],
+                                'reference_a1': allele_names[legend['a1'][rows]],
+                                'TYPE': 'Biallelic_SNP'})
+    af = np.asarray(legend['af'][rows])
+    for j in range(0, len(populations)):
+        legend_file[populations[j]] = af[:, j]
+    legend_file['ALL'] = np.asarray(legend['af_all'][rows])
+    return legend_file
@@ -32,13 +32,90 @@ else:
     genodownload.plink()
 
 
-def merge1000g(harmonized_name, harmonized_path):
+def vcf_to_bed(vcf_file, out_name, threads=1, memory_mb=None, extract='SNPs_Kept_List.txt'):
+    # Convert one 1000G vcf file to plink format, only keeping the snps in the extract file. If extract is None, every
+    # biallelic SNP is kept instead. threads and memory_mb are what this one plink run gets, so several can run at the
+    # same time. With an extract file, the vcf file is first streamed through genovcf.filter_records so plink only
+    # parses the records with those ids instead of the whole chromosome. The filtered records are gzipped, so several
+    # chromosomes at once don't fill the disk.
+    import subprocess
+
+    filtered_vcf = None
+    if extract is not None:
+        import genovcf
+        with open(extract, 'r') as f:
+            snp_ids = [line.strip() for line in f if line.strip()]
+        filtered_vcf = out_name + '_Filtered.vcf.gz'
+        genovcf.filter_records(vcf_file, filtered_vcf, snp_ids)
+        vcf_file = filtered_vcf
+
+    command = [plink, '--vcf', vcf_file, '--double-id', '--biallelic-only', 'strict', '--vcf-require-gt', '--threads',
+               str(threads)]
+    if extract is None:
+        command.extend(['--snps-only', 'just-acgt'])
+    else:
+        command.extend(['--extract', extract])
+    if memory_mb is not None:
+        command.extend(['--memory', str(memory_mb)])
+    subprocess.check_output(command + ['--make-bed', '--out', out_name])
+    if filtered_vcf is not None:
+        os.remove(filtered_vcf)
+
+
+def exclude_snps(geno_names, exclude_name, workers=1, threads=1, memory_mb=None):
+    # Remove the snps in exclude_name (one id per line) from each of geno_names with plink, keeping the same names. Up
+    # to 'workers' files are rewritten at once, each plink run with 'threads' threads and memory_mb MB of memory.
+    # Files that don't have any of the snps are left as they are instead of being rewritten. Returns the names of the
+    # files that were rewritten.
+    import subprocess
+    import concurrent.futures
+    import genobed
+
+    try:
+        import pandas as pd
+    except (ImportError, ModuleNotFoundError):
+        import genodownload
+        genodownload.getpandas()
+        import pandas as pd
+
+    excluded = pd.read_csv(exclude_name, sep='\t', header=None, dtype=str)[0]
+    to_rewrite = [geno_name for geno_name in geno_names if genobed.read_bim(geno_name)['snp'].isin(excluded).any()]
+
+    command = ['--exclude', exclude_name, '--geno', '0.01', '--threads', str(threads)]
+    if memory_mb is not None:
+        command.extend(['--memory', str(memory_mb)])
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, min(workers, 23))) as executor:
+        tasks = [executor.submit(subprocess.check_output, [plink, '--bfile', geno_name] + command +
+                                 ['--make-bed', '--out', geno_name]) for geno_name in to_rewrite]
+        # Wait for every file, so the merge is only retried once all of them are rewritten.
+        for task in tasks:
+            task.result()
+    return to_rewrite
+
+
+def merge1000g(harmonized_name, harmonized_path, workers=1, threads=1, memory_mb=None, use_panel=False,
+               panel_path=None):
+    # The 1000G vcf files are converted to plink format with up to 'workers' chromosomes at once, each plink run using
+    # 'threads' threads and, if memory_mb is given, that many MB of memory. With use_panel, the conversion keeps every
+    # biallelic SNP and is only done once (see genopanel), later merges take their SNPs out of that panel. The panel is
+    # kept in panel_path if it is given, instead of next to the vcf files.
+    # harmonized_name and harmonized_path can also be lists, to merge several harmonized datasets (i.e. genotyping
+    # batches) with 1000G at once. One path is used for all of the datasets.
     import os
     import sys
     import subprocess
+    import concurrent.futures
 
     # Get original working directory
     orig_wd = os.getcwd()
+    if panel_path:
+        panel_path = os.path.abspath(panel_path)
+
+    harmonized_names = [harmonized_name] if isinstance(harmonized_name, str) else list(harmonized_name)
+    harmonized_paths = [harmonized_path] if isinstance(harmonized_path, str) else list(harmonized_path)
+    if len(harmonized_paths) == 1:
+        harmonized_paths = harmonized_paths * len(harmonized_names)
+    merged_name = '_'.join(harmonized_names) + '_1000G'
 
     # Make sure user has harmonized first.
     print(Fore.BLUE + Style.BRIGHT)
@@ -93,67 +170,102 @@ def merge1000g(harmonized_name, harmonized_path):
 
         # Merge 1000G chr data into one plink formatted file, need to convert from vcf files - but only taking the snps
         # that are in the house dataset
-        # Read in SNPs_Kept file from harmonization process
-        if os.path.exists(os.path.join(harmonized_path, 'SNPs_Kept_AFCheck.txt')):
-            house_snps_kept = pd.read_csv(os.path.join(harmonized_path, 'SNPs_Kept_AFCheck.txt'), header=0, sep='\t')
-            # Keep only the 'SNP' column
-            house_snps_kept = house_snps_kept.loc[:, ['SNP']]
-            # Write that column to a file to be used by plink
-            house_snps_kept.to_csv('Merged_With_1000G/SNPs_Kept_List.txt', sep='\t', header=False, index=False)
-        else:
-            sys.exit("Quitting because I cannot find a file called 'SNPs_Kept_AFCheck.txt' at "
-                     + harmonized_path + ". This is a product of the harmonization process and is necessary for "
-                                         "merging with 1000G.")
+        # Read in SNPs_Kept file from harmonization process. With several datasets, only the SNPs kept in all of them
+        # can end up in the merge.
+        house_snps_kept = None
+        for path in dict.fromkeys(harmonized_paths):
+            if not os.path.exists(os.path.join(path, 'SNPs_Kept_AFCheck.txt')):
+                sys.exit("Quitting because I cannot find a file called 'SNPs_Kept_AFCheck.txt' at "
+                         + path + ". This is a product of the harmonization process and is necessary for "
+                                  "merging with 1000G.")
+            path_snps_kept = pd.read_csv(os.path.join(path, 'SNPs_Kept_AFCheck.txt'), header=0, sep='\t',
+                                         dtype={'CHR': str, 'SNP': str})
+            if house_snps_kept is None:
+                house_snps_kept = path_snps_kept
+            else:
+                house_snps_kept = house_snps_kept.loc[house_snps_kept['SNP'].isin(path_snps_kept['SNP'])]
+
+        # Keep only the 'SNP' column
+        house_snps_kept = house_snps_kept.loc[:, ['SNP']]
+        # Write that column to a file to be used by plink
+        house_snps_kept.to_csv('Merged_With_1000G/SNPs_Kept_List.txt', sep='\t', header=False, index=False)
 
         # Change to directory where we're going to merge the files.
         os.chdir('Merged_With_1000G')
 
-        # Convert vcf files to plink format.
-        for i in range(0, len(ref_file_names)):
-            subprocess.check_output([plink, '--vcf', os.path.join(vcf_path, ref_file_names[i]), '--double-id',
-                                     '--biallelic-only', 'strict', '--vcf-require-gt', '--extract',
-                                     'SNPs_Kept_List.txt', '--make-bed', '--out', chr_1000g_phase3_names[i]])
+        if use_panel:
+            # Build the 1000G panel with every biallelic SNP the first time, then just take the house SNPs out of it.
+            import genopanel
+            genopanel.build(vcf_path, workers, threads, memory_mb, panel_path)
+            genopanel.subset(vcf_path, 'SNPs_Kept_List.txt', chr_1000g_phase3_names, panel_path)
+        else:
+            # Convert vcf files to plink format, several chromosomes at the same time.
+            with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, min(workers, 23))) as executor:
+                tasks = [executor.submit(vcf_to_bed, os.path.join(vcf_path, ref_file_names[i]),
+                                         chr_1000g_phase3_names[i], threads, memory_mb, 'SNPs_Kept_List.txt')
+                         for i in range(0, len(ref_file_names))]
+                # Wait for every chromosome, so the merge list is only made once all of them converted. An error in
+                # any of them stops here.
+                for task in tasks:
+                    task.result()
         subprocess.call(rm + '*~', shell=True)
 
+        # Find duplicate ids and positions in the 1000G chromosomes from their bim files, and take them out before the
+        # merge instead of after a failed one.
+        import genobed
+        import genovariants
+        reference_duplicates = genovariants.duplicates([pd.concat([genobed.read_bim(name)
+                                                                   for name in chr_1000g_phase3_names])], ['1000G'])
+        if len(reference_duplicates) > 0:
+            reference_duplicates.to_csv('1000G_Duplicates.txt', sep='\t', header=True, index=False)
+            genovariants.resolve(reference_duplicates).to_csv('1000G_Duplicates_Exclude.txt', sep='\t', header=False,
+                                                              index=False)
+            exclude_snps(chr_1000g_phase3_names, '1000G_Duplicates_Exclude.txt', workers, threads, memory_mb)
+            subprocess.call(rm + '*~', shell=True)
+
         # Create list of files to be merged into one large file.
         with open("1000GMergeList.txt", "w") as f:
             wr = csv.writer(f, delimiter="\n")
             wr.writerow(chr_1000g_phase3_names)
 
-        # Use plink to merge those files into one large file.
-        subprocess.check_output([plink, '--merge-list', '1000GMergeList.txt', '--geno', '0.01', '--make-bed', '--out',
-                                 '1000G_Phase3'])
+        # Remove the merge outputs of an earlier run, so only what this merge writes is read below.
+        for stale_name in ['1000G_Phase3.bed', '1000G_Phase3.bim', '1000G_Phase3.fam', '1000G_Phase3.log',
+                           '1000G_Phase3-merge.missnp', '1000G_MergeWarnings.txt']:
+            if os.path.exists(stale_name):
+                os.remove(stale_name)
+
+        # Use plink to merge those files into one large file. plink stops with an error when there are missnps, which
+        # are dealt with below, so only stop here when it failed for another reason.
+        merge_command = [plink, '--merge-list', '1000GMergeList.txt', '--geno', '0.01', '--make-bed', '--out',
+                         '1000G_Phase3']
+        return_code = subprocess.call(merge_command)
+        if return_code != 0 and not os.path.exists('1000G_Phase3-merge.missnp'):
+            raise subprocess.CalledProcessError(return_code, merge_command)
 
-        # Read in log file from merge.
-        logfile = pd.DataFrame()
-        # Format the log file into a pandas dataframe.
-        with open('1000G_Phase3.log', 'r') as f:
-            for line in f:
-                logfile = pd.concat([logfile, pd.DataFrame([tuple(line.strip().split(" "))])], ignore_index=True)
+        # Read the warnings in the log file from merge.
+        import genoplinklog
+        merge_warnings = genoplinklog.read_warnings('1000G_Phase3.log')
 
         # If the logfile contains warnings, write a text file '1000G_MergeWarnings.txt' with the SNPs that threw
         # warnings.
-        rsid_warnings = []
-        if logfile[0].str.contains('Warning:').any():
-            rsid_warnings = logfile.loc[logfile[0] == 'Warning:', 6].str.split("'", expand=True)
-            rsid_warnings[1].dropna(how='any').to_csv('1000G_MergeWarnings.txt', sep='\t', header=False, index=False)
+        rsid_warnings = pd.concat([merge_warnings['variant'], merge_warnings['other_variant']]).dropna()
+        rsid_warnings = rsid_warnings.drop_duplicates()
+        if len(rsid_warnings) > 0:
+            rsid_warnings.to_csv('1000G_MergeWarnings.txt', sep='\t', header=False, index=False)
 
         # If the text file 1000G_MergeWarnings exists...
         if os.path.exists('1000G_MergeWarnings.txt'):
             # If merge warnings and missnps exist, exclude both from 1000G completely (there are plenty of other snps)
             if os.path.exists('1000G_Phase3-merge.missnp'):
                 # Read in missnp file
-                missnp = pd.read_csv('1000G_Phase3-merge.missnp', sep='\t', header=None)
+                missnp = pd.read_csv('1000G_Phase3-merge.missnp', sep='\t', header=None, dtype=str)
                 # Merge the warning snps with the missnps
-                warnings_missnp = pd.concat([rsid_warnings, missnp], axis=0)
+                warnings_missnp = pd.concat([rsid_warnings, missnp[0]], axis=0)
                 # Drop duplicates and write to a file to be used in plink.
-                warnings_missnp[1].dropna(how='any').to_csv('1000G_warnings_missnp.txt', sep='\t',
-                                                            header=False, index=False)
-                # Remove these snps from plink files and create new plink files.
-                for i in range(0, len(chr_1000g_phase3_names)):
-                    subprocess.check_output([plink, '--bfile', chr_1000g_phase3_names[i], '--exclude',
-                                             '1000G_warnings_missnp.txt', '--geno', '0.01', '--make-bed', '--out',
-                                             chr_1000g_phase3_names[i]])
+                warnings_missnp.drop_duplicates().to_csv('1000G_warnings_missnp.txt', sep='\t', header=False,
+                                                         index=False)
+                # Remove these snps from the plink files that have any of them, several at the same time.
+                exclude_snps(chr_1000g_phase3_names, '1000G_warnings_missnp.txt', workers, threads, memory_mb)
                 # Remove old plink files.
                 subprocess.call(rm + '*~', shell=True)
                 # Retry the merge
@@ -163,11 +275,8 @@ def merge1000g(harmonized_name, harmonized_path):
                 print("Successfully merged 1000G, though you should double-check the log file to be sure.")
 
             else:  # If only merge warnings exist, exclude from 1000G completely
-                # Use plink to exclude the merge warning snps.
-                for i in range(0, len(chr_1000g_phase3_names)):
-                    subprocess.check_output([plink, '--bfile', chr_1000g_phase3_names[i], '--exclude',
-                                             '1000G_MergeWarnings.txt', '--geno', '0.01', '--make-bed', '--out',
-                                             chr_1000g_phase3_names[i]])
+                # Use plink to exclude the merge warning snps from the files that have any of them.
+                exclude_snps(chr_1000g_phase3_names, '1000G_MergeWarnings.txt', workers, threads, memory_mb)
                 # Remove old plink files.
                 subprocess.call(rm + '*~', shell=True)
                 # Try merge again.
@@ -177,12 +286,9 @@ def merge1000g(harmonized_name, harmonized_path):
                 print("Successfully merged 1000G, though you should double-check the log file to be sure.")
 
         # If only the missnps exist, remove them in 1000G.
-        elif os.path.exists('1000G_Phase3-merge.missnp') and os.path.getsize('1000G_MergeWarnings.txt') == 0:
-            # Use plink to remove the missnps
-            for i in range(0, len(chr_1000g_phase3_names)):
-                subprocess.check_output([plink, '--bfile', chr_1000g_phase3_names[i], '--exclude',
-                                         '1000G_Phase3-merge.missnp', '--geno', '0.01', '--make-bed', '--out',
-                                         chr_1000g_phase3_names[i]])
+        elif os.path.exists('1000G_Phase3-merge.missnp'):
+            # Use plink to remove the missnps from the files that have any of them.
+            exclude_snps(chr_1000g_phase3_names, '1000G_Phase3-merge.missnp', workers, threads, memory_mb)
             # Remove old plink files
             subprocess.call(rm + '*~', shell=True)
             # Retry the merge
@@ -203,228 +309,67 @@ def merge1000g(harmonized_name, harmonized_path):
             sys.exit("Unable to merge 1000G chromosome files. You should try to merge them on your own.")
 
         # Merge of house data and 1000G #
-        # Copying harmonized to 1000G files to this folder.
-        shutil.copy2(os.path.join(harmonized_path, harmonized_name + '.bed'), os.getcwd())
-        shutil.copy2(os.path.join(harmonized_path, harmonized_name + '.bim'), os.getcwd())
-        shutil.copy2(os.path.join(harmonized_path, harmonized_name + '.fam'), os.getcwd())
-
-        # Perform initial merge
-        subprocess.check_output([plink, '--bfile', harmonized_name, '--bmerge', '1000G_Phase3', '--geno', '0.01',
-                                 '--make-bed', '--out', harmonized_name + '_1000G'])
-
-        # Read in log file to see if anything went wrong
-        logfile = pd.DataFrame()
-        # Concatenate log file to pandas dataframe.
-        with open(harmonized_name + '_1000G.log', 'r') as f:
-            for line in f:
-                logfile = pd.concat([logfile, pd.DataFrame([tuple(line.strip().split(" "))])], ignore_index=True)
-
-        # Check to see if the logfile has warnings
-        if logfile[0].str.contains('Warning:').any():
-            # Identify the snps that made the warning.
-            rsid_warnings = logfile.loc[logfile[0] == 'Warning:', 6].str.split("'", expand=True)
-            # Put those SNPs in a file so we can remove them.
-            rsid_warnings[1].dropna(how='any').to_csv(harmonized_name + '_1000G_MergeWarnings.txt', sep='\t',
-                                                      header=False, index=False)
-        # If there are merge warnings
-        if os.path.exists(harmonized_name + '_1000G_MergeWarnings.txt'):
-            # and if there are triallelic snps that need to be flipped (missnp)
-            if os.path.exists(harmonized_name + '_1000G-merge.missnp'):
-                # If merge warnings and missnps exist, exclude warning snps from both 1000G and house dataset
-                subprocess.check_output([plink, '--bfile', '1000G_Phase3', '--exclude',
-                                         harmonized_name + '_1000G_MergeWarnings.txt', '--geno', '0.01', '--make-bed',
-                                         '--out', '1000G_Phase3'])
-                # Flip missnps in house dataset.
-                subprocess.check_output([plink, '--bfile', harmonized_name, '--exclude',
-                                         harmonized_name + '_1000G_MergeWarnings.txt', '--flip',
-                                         harmonized_name + '_1000G-merge.missnp', '--geno', '0.01', '--make-bed',
-                                         '--out', harmonized_name])
-                # Remove old files.
-                subprocess.call(rm + '*~', shell=True)
-                # Retry merge.
-                subprocess.check_output([plink, '--bfile', harmonized_name, '--bmerge', '1000G_Phase3', '--geno',
-                                         '0.01', '--make-bed', '--out', harmonized_name + '_1000G_merge2'])
-
-            else:  # If only mergewarnings exists, exclude warning snps from both 1000G and house dataset.
-                subprocess.check_output([plink, '--bfile', '1000G_Phase3', '--exclude',
-                                         harmonized_name + '_1000G_MergeWarnings.txt', '--geno', '0.01', '--make-bed',
-                                         '--out', '1000G_Phase3'])
-                # Exclude warning snps from house dataset.
-                subprocess.check_output([plink, '--bfile', harmonized_name, '--exclude',
-                                         harmonized_name + '_1000G_MergeWarnings.txt', '--geno', '0.01', '--make-bed',
-                                         '--out', harmonized_name])
-                # Remove old plink files.
-                subprocess.call(rm + '*~', shell=True)
-                # Retry merge
-                subprocess.check_output([plink, '--bfile', harmonized_name, '--bmerge', '1000G_Phase3', '--geno',
-                                         '0.01', '--make-bed', '--out', harmonized_name + '_1000G_merge2'])
-        # If only the missnps exist, flip them in the house dataset.
-        elif os.path.exists(harmonized_name + '_1000G-merge.missnp') \
-                and not os.path.exists(harmonized_name + '_1000G_MergeWarnings.txt'):
-            # Flip in house dataset.
-            subprocess.check_output([plink, '--bfile', harmonized_name, '--flip',
-                                     harmonized_name + '_1000G-merge.missnp', '--geno', '0.01', '--make-bed', '--out',
-                                     harmonized_name])
-            # Remove old plink files.
-            subprocess.call(rm + '*~', shell=True)
-            # Retry the merge.
-            subprocess.check_output([plink, '--bfile', harmonized_name, '--bmerge', '1000G_Phase3', '--geno', '0.01',
-                                     '--make-bed', '--out', harmonized_name + '_1000G_merge2'])
-
-        elif os.path.exists(harmonized_name + '_1000G.bim'):
-            # If mergewarnings and missnips don't exist, then hopefully the merge happened successfully on the first
-            # try.
-            print("Successfully merged house dataset with 1000G on the first try, though you should double check. I "
-                  "can't predict every error.")
-            # Copy successfully merged files to original working directory.
-            shutil.copy2(harmonized_name + '_1000G.bed', orig_wd)
-            shutil.copy2(harmonized_name + '_1000G.bim', orig_wd)
-            shutil.copy2(harmonized_name + '_1000G.fam', orig_wd)
-            shutil.copy2(harmonized_name + '_1000G.log', orig_wd)
+        # Link the harmonized to 1000G files into this folder, copying them only if they can't be linked.
+        import genostage
+        for name, path in zip(harmonized_names, harmonized_paths):
+            genostage.stage_files(os.path.join(path, name), os.getcwd())
+
+        # Compare each house bim file with the 1000G one before merging: flip the house SNPs that are on the other
+        # strand and leave out SNPs with 3+ alleles, moved or duplicate ids and different ids at the same position from
+        # every dataset. The merge then works the first time, instead of being redone after every warning or missnp
+        # file.
+        import genoreconcile
+        reference_bim = genobed.read_bim('1000G_Phase3')
+        house_bims = [genobed.read_bim(name) for name in harmonized_names]
+        # Duplicates across all the datasets at once (i.e. two batches with different ids at the same position), kept
+        # in a file so the user can see them.
+        duplicate_variants = genovariants.duplicates(house_bims + [reference_bim], harmonized_names + ['1000G'])
+        duplicate_variants.to_csv(merged_name + '_Duplicates.txt', sep='\t', header=True, index=False)
+        flips = []
+        excludes = [genovariants.resolve(duplicate_variants)]
+        for house_bim in house_bims:
+            flip, exclude = genoreconcile.reconcile(house_bim, reference_bim)
+            flips.append(flip)
+            excludes.append(exclude)
+        exclude = pd.concat(excludes).drop_duplicates()
+        for name, house_bim, flip in zip(harmonized_names, house_bims, flips):
+            # Keep the lists so the user can see what was changed.
+            flip.to_csv(name + '_1000G_Flipped.txt', sep='\t', header=False, index=False)
+            exclude.to_csv(name + '_1000G_Excluded.txt', sep='\t', header=False, index=False)
+            genoreconcile.apply(name, name + '_Reconciled', flip, exclude, bim=house_bim)
+        genoreconcile.apply('1000G_Phase3', '1000G_Phase3_Reconciled', [], exclude, bim=reference_bim)
+
+        # Merge the genotypes of every dataset in-process, in one pass: one read of each bed file and one write of the
+        # merged one. If someone is in more than one dataset, merge once with plink instead. If that still fails, the
+        # message below points the user to the log instead of a plink error.
+        reconciled_names = [name + '_Reconciled' for name in harmonized_names] + ['1000G_Phase3_Reconciled']
+        # The merged files of an earlier run are linked to the copies it put in the original folder.
+        genostage.unlink_outputs(merged_name)
+        if not genobed.merge_samples(reconciled_names, merged_name, max_missing=0.01):
+            with open('HouseMergeList.txt', 'w') as f:
+                f.write('\n'.join(reconciled_names[1:]) + '\n')
+            subprocess.call([plink, '--bfile', reconciled_names[0], '--merge-list', 'HouseMergeList.txt', '--geno',
+                             '0.01', '--make-bed', '--out', merged_name])
+
+        if os.path.exists(merged_name + '.bim'):
+            print("Successfully merged house " + ("dataset" if len(harmonized_names) == 1 else "datasets")
+                  + " with 1000G. " + str(sum(len(flip) for flip in flips)) + " SNPs were flipped and "
+                  + str(len(exclude)) + " SNPs were excluded before merging.")
+            # Put successfully merged files in the original working directory, without symlinks so they stay when
+            # Merged_With_1000G is removed.
+            genostage.stage_files(merged_name, orig_wd, allow_symlink=False)
+            # There is only a log if plink did the merge.
+            if os.path.exists(merged_name + '.log'):
+                shutil.copy2(merged_name + '.log', orig_wd)
 
             # Change back to original working directory.
             os.chdir(orig_wd)
 
         else:
             print(Fore.RED + Style.BRIGHT)
-            sys.exit("The house dataset did not merge properly with 1000G, but not because of SNP merge "
-                     "warnings or SNPs that needed to be flipped. I'm sorry, you'll have to perform the merge on your "
-                     "own.")
-
-        # If we had to perform a second merge because of one of the reasons above.
-        if os.path.exists(harmonized_name + '_1000G_merge2.log'):
-            # Read in log file
-            logfile = pd.DataFrame()
-            # Convert log file to pandas dataframe
-            with open(harmonized_name + '_1000G_merge2.log', 'r') as f:
-                for line in f:
-                    logfile = pd.concat([logfile, pd.DataFrame([tuple(line.strip().split(" "))])], ignore_index=True)
-
-            # Check to see if the logfile has warnings
-            if logfile[0].str.contains('Warning:').any():
-                # Figure out what snps caused the warnings.
-                rsid_warnings = logfile.loc[logfile[0] == 'Warning:', 6].str.split("'", expand=True)
-                # Write these warnings to a text file for plink to use.
-                rsid_warnings[1].dropna(how='any').to_csv(harmonized_name + '_1000G_merge2_warnings.txt', sep='\t',
-                                                          header=False,
-                                                          index=False)
-            # If warnings exist
-            if os.path.exists(harmonized_name + '_1000G_merge2_warnings.txt'):
-                # And if there are still triallelic snps
-                if os.path.exists(harmonized_name + '_1000G_merge2-merge.missnp'):
-                    # Import missnp file to pandas
-                    missnp = pd.read_csv(harmonized_name + '_1000G_merge2-merge.missnp', sep='\t', header=None)
-                    # Merge this with merge warnings snps
-                    warnings_missnp = pd.concat([rsid_warnings, missnp], axis=0)
-                    # Write to text file for plink to use.
-                    warnings_missnp[1].dropna(how='any').to_csv(harmonized_name + '_1000G_merge2_warnings_missnp.txt',
-                                                                sep='\t', header=False, index=False)
-                    # Remove all of these snps from 1000G dataset.
-                    subprocess.check_output([plink, '--bfile', '1000G_Phase3', '--exclude',
-                                             harmonized_name + '_1000G_merge2_warnings_missnp.txt', '--geno', '0.01',
-                                             '--make-bed', '--out', '1000G_Phase3'])
-                    # Remove all of these snps from house dataset.
-                    subprocess.check_output([plink, '--bfile', harmonized_name, '--exclude',
-                                             harmonized_name + '_1000G_merge2_warnings_missnp.txt', '--geno', '0.01',
-                                             '--make-bed', '--out', harmonized_name])
-                    # Remove old plink files.
-                    subprocess.call(rm + '*~', shell=True)
-                    # Try merge a third time.
-                    subprocess.check_output([plink, '--bfile', harmonized_name, '--bmerge', '1000G_Phase3', '--geno',
-                                             '0.01', '--make-bed', '--out', harmonized_name + '_1000G_merge3'])
-
-                else:  # If only merge warnings still exist, exclude from both 1000G and house dataset.
-                    # Exclude from 1000G dataset.
-                    subprocess.check_output([plink, '--bfile', '1000G_Phase3', '--exclude',
-                                             harmonized_name + '_1000G_merge2_warnings.txt', '--geno', '0.01',
-                                             '--make-bed', '--out', '1000G_Phase3'])
-                    # Exclude from house dataset
-                    subprocess.check_output([plink, '--bfile', harmonized_name, '--exclude',
-                                             harmonized_name + '_1000G_merge2_warnings.txt', '--geno', '0.01',
-                                             '--make-bed', '--out', harmonized_name])
-                    # Remove old plink files.
-                    subprocess.call(rm + '*~', shell=True)
-                    # Retry merge a third time.
-                    subprocess.check_output([plink, '--bfile', harmonized_name, '--bmerge', '1000G_Phase3', '--geno',
-                                             '0.01', '--make-bed', '--out', harmonized_name + '_1000G_merge3'])
-            # If only the missnps still exist, remove them in both datasets.
-            elif os.path.exists(harmonized_name + '_1000G_merge2-merge.missnp') \
-                    and not os.path.exists(harmonized_name + '_1000G_merge2_warnings.txt'):
-                # Exclude from house dataset.
-                subprocess.check_output([plink, '--bfile', harmonized_name, '--exclude',
-                                         harmonized_name + '_1000G_merge2-merge.missnp', '--geno', '0.01', '--make-bed',
-                                         '--out', harmonized_name])
-                # Exclude from 1000G dataset.
-                subprocess.check_output([plink, '--bfile', '1000G_Phase3', '--exclude',
-                                         harmonized_name + '_1000G_merge2-merge.missnp', '--geno', '0.01', '--make-bed',
-                                         '--out', '1000G_Phase3'])
-                # Remove old files.
-                subprocess.call(rm + '*~', shell=True)
-                # Retry merge a third time.
-                subprocess.check_output([plink, '--bfile', harmonized_name, '--bmerge', '1000G_Phase3', '--geno',
-                                         '0.01', '--make-bed', '--out', harmonized_name + '_1000G_merge3'])
-            # If we don't find warnings or missnps
-            elif os.path.exists(harmonized_name + '_1000G_merge2.bim'):
-                # Merge should have happened, but user should check.
-                print("Successfully merged house dataset with 1000G on 2nd try, though you should double check. I "
-                      "can't predict every error.")
-                # Copy merged files to original working directory
-                shutil.copy2(harmonized_name + '_1000G_merge2.bed', orig_wd)
-                shutil.copy2(harmonized_name + '_1000G_merge2.bim', orig_wd)
-                shutil.copy2(harmonized_name + '_1000G_merge2.fam', orig_wd)
-                shutil.copy2(harmonized_name + '_1000G_merge2.log', orig_wd)
-
-                # Change back to original working directory.
-                os.chdir(orig_wd)
-            # If the merge didn't happen, but not because of merge warnings or missnps.
-            else:
-                print(Fore.RED + Style.BRIGHT)
-                sys.exit("House dataset and 1000G did not successfully merge 2nd time, though not because of merge "
-                         "warnings or SNPs that needed to be flipped. You'll have to perform the merge on your own. "
-                         "I'm sorry!")
-
-        if os.path.exists(harmonized_name + '_1000G_merge3.log'):
-            # If merge 3 log exists, read it into pandas dataframe.
-            logfile = pd.DataFrame()
-            with open(harmonized_name + '_1000G_merge3.log', 'r') as f:
-                for line in f:
-                    logfile = pd.concat([logfile, pd.DataFrame([tuple(line.strip().split(" "))])], ignore_index=True)
-
-            # If the bim file doesn't exist, try to figure out why.
-            if not os.path.exists(harmonized_name + '_1000G_merge3.bim'):
-                # If logfile still has warnings, or there are still missnps, the user will need to identify them and
-                # take care of them manually.
-                if logfile[0].str.contains('Warning:').any() \
-                        and os.path.exists(harmonized_name + '_1000G_merge3-merge.missnp'):
-                    print(Fore.RED + Style.BRIGHT)
-                    sys.exit("I'm sorry, the logfile still has warnings, even after removing snps that "
-                             "threw errors in the first two tries. There are also still snps with 3+ variants present, "
-                             "even after flipping some and removing the ones that the flip didn't solve. You'll have "
-                             "to manually deal with these using the merge3 log and the merge3-merge.missnp file.")
-                # Check to see if the logfile still has warnings
-                elif logfile[0].str.contains('Warning:').any():
-                    print(Fore.RED + Style.BRIGHT)
-                    sys.exit("I'm sorry, the logfile still has warnings, even after removing snps that threw errors in "
-                             "the first two tries. You'll have to manually deal with these using the merge3 log file.")
-                # If triallelic snps still exist
-                elif os.path.exists(harmonized_name + '_1000G_merge3-merge.missnp'):
-                    print(Fore.RED + Style.BRIGHT)
-                    sys.exit("I'm sorry, there are still snps with 3+ variants present, even after flipping some and "
-                             "removing the ones that the flip didn't solve. You'll have to deal with these manually "
-                             "using the merge3-merge.missnp file")
-
-            # If the bim file exists, then the merge should have happened correctly.
-            if os.path.exists(harmonized_name + '_1000G_merge3.bim'):
-                print("House dataset and 1000G merged correctly on 3rd try. Though you should double-check the log "
-                      "file, I can't predict every error.")
-                # Copy files to original working directory.
-                shutil.copy2(harmonized_name + '_1000G_merge3.bed', orig_wd)
-                shutil.copy2(harmonized_name + '_1000G_merge3.bim', orig_wd)
-                shutil.copy2(harmonized_name + '_1000G_merge3.fam', orig_wd)
-                shutil.copy2(harmonized_name + '_1000G_merge3.log', orig_wd)
-
-                # Change back to original working directory.
-                os.chdir(orig_wd)
+            sys.exit("The house data did not merge properly with 1000G, even after flipping and excluding the SNPs "
+                     "that didn't match. Please check " + merged_name + ".log. I'm sorry, you'll have to "
+                     "perform the merge on your own.")
 
     # End the program if the user did not harmonize first.
     elif merge_proceed in ('n', 'no'):
@@ -0,0 +1,108 @@
+# A 1000G Phase 3 reference panel in plink format with every biallelic SNP, built once from the vcf files (in a
+# '1000G_Panel' folder next to them, or in a folder of its own) and reused by every merge with 1000G. Converting the vcf
+# files takes hours, while taking the SNPs of one project out of the panel only copies their rows of the bed files.
+import os
+import json
+
+try:
+    import pandas as pd
+except (ImportError, ModuleNotFoundError):
+    import genodownload
+    genodownload.getpandas()
+    import pandas as pd
+
+import genobed
+
+# 1000G vcf files and the panel files made from them, per chromosome (23 = X).
+vcf_file_names = ['ALL.chr%d.phase3_shapeit2_mvncall_integrated_v5a.20130502.genotypes.vcf.gz' % x for x in
+                  range(1, 23)]
+vcf_file_names.extend(['ALL.chrX.phase3_shapeit2_mvncall_integrated_v1b.20130502.genotypes.vcf.gz'])
+panel_names = ['chr%d_1000G_Phase3' % x for x in range(1, 24)]
+
+
+def panel_dirs(vcf_path, panel_path=None):
+    # Folders that can hold the panel: panel_path if one is given (i.e. a shared folder so it is built once for every
+    # project), next to the vcf files like the legend cache, or in the working folder for a shared copy of the vcf
+    # files that is read only, like genovcf.slice_dirs.
+    folders = [os.path.join(os.path.abspath(vcf_path), '1000G_Panel'), os.path.join(os.getcwd(), '1000G_Panel')]
+    return ([os.path.abspath(panel_path)] if panel_path else []) + folders
+
+
+def panel_dir(vcf_path, panel_path=None):
+    # Folder a new panel is built in, made if it isn't there: the first of panel_dirs that can be written to.
+    for folder in panel_dirs(vcf_path, panel_path):
+        try:
+            os.makedirs(folder, exist_ok=True)
+        except OSError:
+            continue
+        if os.access(folder, os.W_OK):
+            return folder
+    raise OSError('No folder to build the 1000G panel in: ' + ', '.join(panel_dirs(vcf_path, panel_path)))
+
+
+def vcf_sources(vcf_path):
+    # Size and modification time of each vcf file, saved with the panel so a new download rebuilds it.
+    sources = {}
+    for vcf_file_name in vcf_file_names:
+        stat = os.stat(os.path.join(vcf_path, vcf_file_name))
+        sources[vcf_file_name] = [stat.st_size, int(stat.st_mtime)]
+    return sources
+
+
+def current_panel(vcf_path, panel_path=None):
+    # The first of panel_dirs with a panel built from vcf files that haven't changed since, None if there isn't one.
+    # source.json is written last, so a panel with one is complete.
+    sources = None
+    for folder in panel_dirs(vcf_path, panel_path):
+        source_name = os.path.join(folder, 'source.json')
+        if not os.path.exists(source_name):
+            continue
+        if sources is None:
+            sources = vcf_sources(vcf_path)
+        with open(source_name) as f:
+            if json.load(f) == sources:
+                return folder
+    return None
+
+
+def is_current(vcf_path, panel_path=None):
+    # True if one of panel_dirs has a current panel.
+    return current_panel(vcf_path, panel_path) is not None
+
+
+def build(vcf_path, workers=1, threads=1, memory_mb=None, panel_path=None):
+    # One time build step: convert every vcf file to plink format, keeping all biallelic SNPs. Up to 'workers'
+    # chromosomes are converted at once, each plink run with 'threads' threads and memory_mb MB of memory. Returns the
+    # folder the panel is in.
+    import concurrent.futures
+    import genomerge
+
+    folder = current_panel(vcf_path, panel_path)
+    if folder is not None:
+        return folder
+    folder = panel_dir(vcf_path, panel_path)
+
+    print('Building the 1000G reference panel in ' + folder + '. This only has to be done once.')
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, min(workers, 23))) as executor:
+        tasks = [executor.submit(genomerge.vcf_to_bed, os.path.join(vcf_path, vcf_file_names[i]),
+                                 os.path.join(folder, panel_names[i]), threads, memory_mb, None)
+                 for i in range(0, len(vcf_file_names))]
+        for task in tasks:
+            task.result()
+
+    with open(os.path.join(folder, 'source.json'), 'w') as f:
+        json.dump(vcf_sources(vcf_path), f)
+    return folder
+
+
+def subset(vcf_path, snp_list_name, out_names, panel_path=None):
+    # Take the SNPs in snp_list_name (one id per line, like a plink --extract file) out of the current panel, writing
+    # one set of plink files per chromosome to out_names.
+    folder = current_panel(vcf_path, panel_path)
+    if folder is None:
+        raise OSError('There is no current 1000G panel for ' + vcf_path + ', build it first.')
+    snps = pd.read_csv(snp_list_name, header=None, dtype=str)[0]
+    for panel_name, out_name in zip(panel_names, out_names):
+        panel_geno_name = os.path.join(folder, panel_name)
+        bim_file = genobed.read_bim(panel_geno_name)
+        genobed.extract(panel_geno_name, out_name, bim_file['snp'].isin(snps).values, bim=bim_file)
@@ -110,9 +110,10 @@ def phase(geno_name, allocation_name):
     output_vcf_log = ['Phasing/' + geno_name + '_PhasedTo1000G.chr%d.vcf.log' % x for x in range(1,24)]
 
     # Make list of people with unspecified sex.
-    fam_file = pd.read_csv(geno_name + '.fam', sep=' ', header=None)
-    unknownsex = fam_file.loc[fam_file[4] == 0]
-    unknownsex[[0, 1]].to_csv(geno_name + '_SexUnknown.txt', sep='\t', header=None, index=False)
+    import genobed
+    fam_file = genobed.read_fam(geno_name)
+    unknownsex = fam_file.loc[fam_file['sex'] == 0]
+    unknownsex[['fid', 'iid']].to_csv(geno_name + '_SexUnknown.txt', sep='\t', header=None, index=False)
 
     # Use plink to set mendel errors to missing.
     if os.path.getsize(geno_name + '_SexUnknown.txt') > 0:
@@ -0,0 +1,253 @@
+# Lazy filters on a plink dataset. A Dataset only records the filters to run (the plan); nothing is read until they
+# are resolved into a mask of the variants and a mask of the people to keep. The genotypes are then read once, to
+# write one new set of plink files at the end (write) or to hand the kept genotypes straight to the next step
+# (iter_dosages), instead of writing a new set of files after every filter. Filters run in the order they were added,
+# so geno then mind removes people by their missing calls on the variants left after geno, like running plink --geno
+# and then plink --mind on its output.
+import collections
+
+try:
+    import numpy as np
+except (ImportError, ModuleNotFoundError):
+    import genodownload
+    genodownload.getnumpy()
+    import numpy as np
+
+try:
+    import pandas as pd
+except (ImportError, ModuleNotFoundError):
+    import genodownload
+    genodownload.getpandas()
+    import pandas as pd
+
+import genobed
+import genovariants
+
+# A plink dataset with filters to run: the bim and fam dataframes (the fam can be replaced, i.e. with updated sex or
+# ids, and is written with the output) and a tuple of (kind, value) filters.
+Dataset = collections.namedtuple('Dataset', ['geno_name', 'bim', 'fam', 'filters'])
+
+# Filters that only look at the bim or fam file, and filters that count genotypes. geno, mind, maf and hwe take the
+# same thresholds as the plink options, and maf and hwe are counted in founders, like plink.
+variant_lists = ('extract', 'exclude', 'chr')
+sample_lists = ('keep', 'remove')
+genotype_filters = ('geno', 'mind', 'maf', 'hwe')
+
+
+def dataset(geno_name):
+    # A Dataset of geno_name without any filters. Only the bim and fam files are read.
+    return Dataset(geno_name, genobed.read_bim(geno_name), genobed.read_fam(geno_name), ())
+
+
+def add(data, kind, value):
+    # A new Dataset with one more filter. extract and exclude take SNP ids, chr takes chromosomes, keep and remove take
+    # a dataframe whose first two columns are FID and IID. A string is read as a file with those in its columns, like
+    # the plink options.
+    if kind not in variant_lists + sample_lists + genotype_filters:
+        raise ValueError('Unknown filter: ' + str(kind))
+    return data._replace(filters=data.filters + ((kind, value),))
+
+
+def add_all(data, filters):
+    # A new Dataset with several (kind, value) filters added in order.
+    for kind, value in filters:
+        data = add(data, kind, value)
+    return data
+
+
+def read_list(value, columns):
+    # The first columns of a list given as a file name or a dataframe (or a list of values for one column) as strings.
+    if isinstance(value, str):
+        value = pd.read_csv(value, sep='\s+', header=None, usecols=range(columns), dtype=str)
+    elif not isinstance(value, pd.DataFrame):
+        value = pd.DataFrame({0: [str(item) for item in value]})
+    return value.iloc[:, :columns].astype(str)
+
+
+def list_mask(data, kind, value):
+    # The variants (for extract, exclude and chr) or people (for keep and remove) that a list filter keeps.
+    if kind == 'chr':
+        # Chromosomes can be given by name or by number (X or 23).
+        chromosomes = set(read_list(value, 1).iloc[:, 0].str.upper())
+        chromosomes |= {code for name, code in genovariants.chromosome_codes.items() if name in chromosomes}
+        chromosomes |= {name for name, code in genovariants.chromosome_codes.items() if code in chromosomes}
+        return data.bim['chr'].str.upper().isin(chromosomes).values
+    if kind in variant_lists:
+        listed = data.bim['snp'].isin(set(read_list(value, 1).iloc[:, 0])).values
+    else:
+        people = read_list(value, 2)
+        listed = pd.MultiIndex.from_arrays([data.fam['fid'], data.fam['iid']]).isin(
+            pd.MultiIndex.from_arrays([people.iloc[:, 0], people.iloc[:, 1]]))
+    return listed if kind in ('extract', 'keep') else ~listed
+
+
+def founders(fam):
+    return ((fam['father'] == '0') & (fam['mother'] == '0')).values
+
+
+def count(data, variants, samples, block_size=20000):
+    # Count, in one pass over the kept part of the bed file, the missing genotypes of each variant and of each person
+    # and the genotypes of founders, on the packed bytes (see genobed.code_counts and sample_counts). Arrays have an
+    # entry for every variant or person, 0 for those not kept.
+    bed = genobed.open_bed(data.geno_name, len(data.bim), len(data.fam))
+    counts = {name: np.zeros(len(data.bim), dtype=np.int64)
+              for name in ('variant_missing', 'founder_hom_a1', 'founder_het', 'founder_hom_a2')}
+    counts['sample_missing'] = np.zeros(len(data.fam), dtype=np.int64)
+    sample_rows = np.flatnonzero(samples)
+    founder_rows = np.flatnonzero(founders(data.fam) & samples)
+    rows = np.flatnonzero(variants) if len(sample_rows) > 0 else []
+    for start in range(0, len(rows), block_size):
+        block_rows = rows[start:start + block_size]
+        block = np.asarray(bed[block_rows])
+        kept_block = block if len(sample_rows) == len(data.fam) else genobed.gather_samples(block, sample_rows)
+        counts['variant_missing'][block_rows] = genobed.code_counts(kept_block, len(sample_rows))[1]
+        counts['sample_missing'][sample_rows] += genobed.sample_counts(kept_block, len(sample_rows))
+        if len(founder_rows) > 0:
+            founder_block = block if len(founder_rows) == len(data.fam) else genobed.gather_samples(block,
+                                                                                                    founder_rows)
+            founder_counts = genobed.code_counts(founder_block, len(founder_rows))
+            counts['founder_hom_a1'][block_rows] = founder_counts[0]
+            counts['founder_het'][block_rows] = founder_counts[2]
+            counts['founder_hom_a2'][block_rows] = founder_counts[3]
+    return counts
+
+
+def saved_counts(data):
+    # Counts for everyone, from the QC statistics of the dataset (see genostats), as cache entries for resolve(): the
+    # variant counts and missing calls over every variant, and the missing calls over the variants passing the geno
+    # threshold of the statistics. Only when the fam founders are the ones the statistics were counted with.
+    import genostats
+
+    stats = genostats.load(data.geno_name)
+    if not (founders(data.fam) == founders(genobed.read_fam(data.geno_name))).all():
+        return []
+    everyone = np.ones(len(data.fam), dtype=bool)
+    counts = {name: stats[name] for name in ('variant_missing', 'founder_hom_a1', 'founder_het', 'founder_hom_a2')}
+    counts['sample_missing'] = stats['sample_missing']
+    geno_variants = stats['variant_missing'] <= stats['source'][1] * len(data.fam)
+    return [(np.ones(len(data.bim), dtype=bool), everyone, counts),
+            (geno_variants, everyone, {'sample_missing': stats['sample_missing_geno']})]
+
+
+def counts_for(data, variants, samples, axis, cache):
+    # Counts that are right for the kept variants ('variant' axis) or people ('sample' axis). Per-variant counts only
+    # depend on the people kept, so they can come from a pass over more variants, and the other way around. A new
+    # pass is made (and cached) when nothing in the cache fits.
+    for counted_variants, counted_samples, counts in cache:
+        if axis == 'variant' and 'variant_missing' in counts and (counted_samples == samples).all() and \
+                not (variants & ~counted_variants).any():
+            return counts
+        if axis == 'sample' and (counted_variants == variants).all() and not (samples & ~counted_samples).any():
+            return counts
+    counts = count(data, variants, samples)
+    cache.append((variants.copy(), samples.copy(), counts))
+    return counts
+
+
+def resolve(data):
+    # Run the filters of a Dataset in order and return the boolean masks of the variants and people it keeps.
+    return run(data)[:2]
+
+
+def run(data):
+    # Run the filters of a Dataset in order. List filters only look at the bim and fam. Genotype filters use the QC
+    # statistics while everyone is kept, and otherwise one pass over the kept genotypes, which later filters reuse
+    # when they can. Returns the variant and people masks and the counts cache (see counts_for).
+    import genohwe
+
+    variants = np.ones(len(data.bim), dtype=bool)
+    samples = np.ones(len(data.fam), dtype=bool)
+    cache = None
+    for kind, value in data.filters:
+        if kind in variant_lists:
+            variants &= list_mask(data, kind, value)
+        elif kind in sample_lists:
+            samples &= list_mask(data, kind, value)
+        else:
+            # The QC statistics only help while everyone is still kept.
+            if cache is None:
+                cache = saved_counts(data) if samples.all() else []
+            if kind == 'mind':
+                counts = counts_for(data, variants, samples, 'sample', cache)
+                samples &= counts['sample_missing'] <= value * variants.sum()
+                continue
+            counts = counts_for(data, variants, samples, 'variant', cache)
+            if kind == 'geno':
+                variants &= counts['variant_missing'] <= value * samples.sum()
+                continue
+            hom_a1, het, hom_a2 = counts['founder_hom_a1'], counts['founder_het'], counts['founder_hom_a2']
+            rows = np.flatnonzero(variants)
+            if kind == 'maf':
+                with np.errstate(invalid='ignore', divide='ignore'):
+                    a1_frq = (2 * hom_a1[rows] + het[rows]) / (2 * (hom_a1[rows] + het[rows] + hom_a2[rows]))
+                variants[rows] = np.minimum(a1_frq, 1 - a1_frq) >= value
+            else:
+                variants[rows] = genohwe.hwe_exact(het[rows], hom_a1[rows], hom_a2[rows]) >= value
+    return variants, samples, [] if cache is None else cache
+
+
+def heterozygosity(data, block_size=20000):
+    # Heterozygosity of the people a Dataset keeps on the autosomal variants it keeps, like plink --het with the same
+    # filters: the expected homozygosity uses the allele frequencies of the kept founders. Returns a dataframe like a
+    # plink .het file (FID, IID, O(HOM), E(HOM), N(NM), F), one row per kept person.
+    import genostats
+
+    variants, samples, cache = run(data)
+    counts = counts_for(data, variants, samples, 'variant', cache)
+    sample_rows = np.flatnonzero(samples)
+    autosome = pd.to_numeric(data.bim['chr'], errors='coerce').between(1, 22).values
+    rows = np.flatnonzero(variants & autosome) if len(sample_rows) > 0 else []
+    totals = {'observed_hom': np.zeros(len(sample_rows), dtype=np.int64),
+              'expected_hom': np.zeros(len(sample_rows), dtype=np.float64),
+              'called_het': np.zeros(len(sample_rows), dtype=np.int64)}
+
+    bed = genobed.open_bed(data.geno_name, len(data.bim), len(data.fam))
+    for start in range(0, len(rows), block_size):
+        block_rows = rows[start:start + block_size]
+        block = np.asarray(bed[block_rows])
+        if len(sample_rows) < len(data.fam):
+            block = genobed.gather_samples(block, sample_rows)
+        expected = genostats.expected_homozygosity(counts['founder_hom_a1'][block_rows],
+                                                   counts['founder_het'][block_rows],
+                                                   counts['founder_hom_a2'][block_rows])
+        genostats.count_het(block, expected, len(sample_rows), totals)
+
+    return pd.concat([pd.DataFrame({'FID': data.fam['fid'].values[sample_rows],
+                                    'IID': data.fam['iid'].values[sample_rows]}),
+                      genostats.heterozygosity(totals)], axis=1)
+
+
+def iter_dosages(data, block_size=20000):
+    # Stream the genotypes a Dataset keeps into the next step without writing files: yields the kept row numbers of
+    # each block and its dosages (see genobed.dosages), with only the kept people.
+    variants, samples = resolve(data)
+    bed = genobed.open_bed(data.geno_name, len(data.bim), len(data.fam))
+    return genobed.iter_dosages(bed, len(data.fam), variants, np.flatnonzero(samples), block_size)
+
+
+def kept(data):
+    # The bim and fam dataframes of the variants and people a Dataset keeps.
+    variants, samples = resolve(data)
+    return data.bim[variants].reset_index(drop=True), data.fam[samples].reset_index(drop=True)
+
+
+def write(data, out_name, block_size=20000):
+    # Write what a Dataset keeps to out_name in one pass over the bed file. A geno filter at the end is done while
+    # writing, since it only needs the kept genotypes of each variant. When everything is kept, only the fam file is
+    # written and the bed and bim files are linked. Returns the number of variants written.
+    filters = data.filters
+    max_missing = None
+    if filters and filters[-1][0] == 'geno':
+        max_missing = filters[-1][1]
+        filters = filters[:-1]
+    variants, samples = resolve(data._replace(filters=filters))
+
+    if max_missing is None and variants.all() and samples.all():
+        genobed.update_fam(data.geno_name, out_name, data.fam)
+        return len(data.bim)
+    n_written = genobed.subset(data.geno_name, out_name, variants=variants, samples=samples, bim=data.bim,
+                               fam=data.fam, max_missing=max_missing, block_size=block_size)
+    # subset copies the fam lines of the files, so a replaced fam is written over them.
+    if not data.fam.equals(genobed.read_fam(data.geno_name)):
+        genobed.write_fam(data.fam[samples], out_name)
+    return n_written
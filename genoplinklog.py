@@ -0,0 +1,74 @@
+# Reads the warnings out of plink log files in one pass over the file, without building a dataframe line by line.
+# Each warning becomes a record with its kind, the variant it is about, the other variant for warnings about two of
+# them, the alleles and the file it mentions (None when the warning doesn't say).
+import re
+import collections
+
+try:
+    import pandas as pd
+except (ImportError, ModuleNotFoundError):
+    import genodownload
+    genodownload.getpandas()
+    import pandas as pd
+
+PlinkWarning = collections.namedtuple('PlinkWarning', ['kind', 'variant', 'other_variant', 'alleles', 'file',
+                                                       'message'])
+
+# Kinds of warnings plink writes while merging, found by a piece of the text of the warning. The first kind with a
+# matching piece wins. Plain substring checks are used since they are much faster than a regular expression.
+warning_kinds = [('same_position', ('have the same position',)),
+                 ('multiple_positions', ('Multiple positions seen for variant',)),
+                 ('multiple_chromosomes', ('Multiple chromosomes seen for variant',)),
+                 ('multiple_alleles', ('3+ alleles', 'more than two alleles', 'multiple alleles')),
+                 ('duplicate_id', ('uplicate variant', 'uplicate ID')),
+                 ('allele_mismatch', ('allele', 'strand'))]
+quoted = re.compile(r"'([^']*)'")
+allele_pair = re.compile(r"\b[ACGTN0]+/[ACGTN0]+\b")
+# File names are found by their extension first, which is much faster than looking for a name at every character.
+file_extension = re.compile(r"\.(?:bed|bim|fam|ped|map|vcf\.gz|vcf|missnp|hh|txt)\b")
+
+
+def parse_line(line):
+    # Turn one line of a log file into a PlinkWarning, or None if it isn't a warning.
+    if not line.startswith('Warning:'):
+        return None
+    message = line[8:].strip()
+    kind = 'other'
+    for name, pieces in warning_kinds:
+        for piece in pieces:
+            if piece in message:
+                kind = name
+                break
+        if kind != 'other':
+            break
+
+    file = file_extension.search(message) if '.' in message[:-1] else None
+    if file:
+        # The file name starts after the last space or quote before its extension.
+        start = max(message.rfind(' ', 0, file.start()), message.rfind("'", 0, file.start())) + 1
+        file = message[start:file.end()]
+
+    # The variant is the first thing in quotes that isn't the file name. Warnings about two variants at the same
+    # position name both, and both have to be excluded.
+    variants = [value for value in quoted.findall(message) if value != file]
+    variant = variants[0] if variants else None
+    other_variant = variants[1] if kind == 'same_position' and len(variants) > 1 else None
+
+    alleles = allele_pair.search(message) if '/' in message else None
+    alleles = alleles.group(0) if alleles else None
+    return PlinkWarning(kind, variant, other_variant, alleles, file, message)
+
+
+def iter_warnings(log_name):
+    # Yield the warnings in a log file one at a time, reading it a line at a time.
+    with open(log_name, 'r') as f:
+        for line in f:
+            warning = parse_line(line)
+            if warning is not None:
+                yield warning
+
+
+def read_warnings(log_name):
+    # All the warnings in a log file as a dataframe with the columns kind, variant, other_variant, alleles, file and
+    # message.
+    return pd.DataFrame(list(iter_warnings(log_name)), columns=PlinkWarning._fields)
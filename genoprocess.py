@@ -260,8 +260,9 @@ elif to_do == '8':
         # Ask if the user is on the cluster right now to determine if we should submit the files for them
         print(Fore.BLUE + Style.BRIGHT)
         on_cluster = input('Are you currently running this from the Penn State ACI-B cluster? If yes, I make this '
-                           'process as a job and submit it to run. If you are not on the cluster, then this will run '
-                           'locally and will take approximately 15 hours. (y/n): ').lower()
+                           'process into one job per chromosome and submit them to run. If you are not on the '
+                           'cluster, then this will run locally and will take approximately 15 hours if chromosomes '
+                           'are harmonized one at a time. (y/n): ').lower()
         print(Style.RESET_ALL)
         # If they are on the cluster, then run as a job.
         if on_cluster in ('yes', 'y'):
@@ -275,9 +276,22 @@ elif to_do == '8':
 
         # If they are not on the cluster, then run on their local machine.
         elif on_cluster in ('no', 'n'):
+            # Chromosomes can be harmonized at the same time, ask how many and how much memory they can use.
+            print(Fore.GREEN)
+            workers = input('How many chromosomes would you like to harmonize at the same time? Each one needs about '
+                            '2GB of memory (i.e. 4): ')
+            memory = input('How much memory (in GB) can harmonization use in total (i.e. 8)?: ')
+            print(Style.RESET_ALL)
+
+            if workers.isdigit() and memory.isdigit():
+                pass
+            else:
+                sys.exit("Please enter integers for the number of chromosomes and the memory. Exiting now.")
+
             # Run harmonization script on their local machine.
             import genoharmonize
-            genoharmonize.local(geno_name, harmonizer_path, vcf_path, legend_path, fasta_path)
+            genoharmonize.local(geno_name, harmonizer_path, vcf_path, legend_path, fasta_path, workers=int(workers),
+                                memory_mb=int(memory) * 1024)
 
     # If they have not checked that they are on hg19, quit
     elif coord_check in ('no', 'n'):
@@ -303,17 +317,49 @@ elif to_do == '10':
     # Ask user genotype names.
     print(Fore.BLUE + Style.BRIGHT)
     harmonized_name = input('Please enter the name of the harmonized genotype files you would like to merge with 1000G '
-                            '(without bed/bim/fam extension: ')
+                            '(without bed/bim/fam extension, separate several batches with commas): ')
     print(Style.RESET_ALL)
 
     print(Fore.MAGENTA + Style.BRIGHT)
     harmonize_path = input('Please enter the path name where your harmonized genotype files are '
-                           '(i.e. C:\\Users\\Julie White\\Box Sync\\Harmonized\\ etc.): ')
+                           '(i.e. C:\\Users\\Julie White\\Box Sync\\Harmonized\\ etc.). For several batches in '
+                           'different folders, separate the paths with commas in the same order: ')
+    print(Style.RESET_ALL)
+
+    # Several batches are merged with 1000G together.
+    harmonized_name = [name.strip() for name in harmonized_name.split(',')]
+    if len(harmonized_name) > 1:
+        harmonize_path = [path.strip() for path in harmonize_path.split(',')]
+        if len(harmonize_path) not in (1, len(harmonized_name)):
+            sys.exit("Please enter one path, or one path for each batch. Exiting now.")
+
+    # The 1000G chromosomes can be converted from vcf at the same time, ask how many and what each one can use.
+    print(Fore.GREEN)
+    workers = input('How many 1000G chromosomes would you like to convert at the same time (i.e. 4)?: ')
+    threads = input('How many threads can each one use (i.e. 2)?: ')
+    memory = input('How much memory (in GB) can each one use (i.e. 2)?: ')
+    print(Style.RESET_ALL)
+
+    if workers.isdigit() and threads.isdigit() and memory.isdigit():
+        pass
+    else:
+        sys.exit("Please enter integers for the number of chromosomes, threads and the memory. Exiting now.")
+
+    # A full 1000G panel takes about 50GB, but after it is built once merging is much faster.
+    print(Fore.BLUE + Style.BRIGHT)
+    use_panel = input('Would you like to use a full 1000G reference panel that is built once next to the 1000G vcf '
+                      'files (about 50GB) and reused for every merge? (y/n): ').lower()
+    panel_path = None
+    if use_panel in ('y', 'yes'):
+        # The vcf files are often in a shared folder that can't be written to, the panel can be kept somewhere else.
+        panel_path = input('Please enter the folder to keep the panel in, or press enter to keep it next to the 1000G '
+                           'vcf files (or in Merged_With_1000G if that folder is read only): ').strip() or None
     print(Style.RESET_ALL)
 
     # Import module and run.
     import genomerge
-    genomerge.merge1000g(harmonized_name, harmonize_path)
+    genomerge.merge1000g(harmonized_name, harmonize_path, workers=int(workers), threads=int(threads),
+                         memory_mb=int(memory) * 1024, use_panel=use_panel in ('y', 'yes'), panel_path=panel_path)
 
 # PrepAdmixture: Prepares files for running ADMIXTURE, using 1000G as reference.
 # Steps:
@@ -43,10 +43,25 @@ def update_sex(geno_name, update_sex_filename):
     #   1) FID
     #   2) IID
     #   3) Sex (1 = M, 2 = F, 0 = missing)
-    import subprocess
+    # Only the fam file changes, so it is written in Python and the bed and bim files are linked instead of rewritten.
+    try:
+        import pandas as pd
+    except (ImportError, ModuleNotFoundError):
+        import genodownload
+        genodownload.getpandas()
+        import pandas as pd
+
+    import genobed
 
-    subprocess.check_output([plink, '--bfile', geno_name, '--update-sex', update_sex_filename, '--make-bed', '--out',
-                             geno_name + '_SexUpdated'])
+    fam = genobed.read_fam(geno_name)
+    updates = pd.read_csv(update_sex_filename, sep='\s+', header=None, usecols=[0, 1, 2],
+                          names=['fid', 'iid', 'new_sex'], dtype=str).drop_duplicates(['fid', 'iid'], keep='last')
+    # A left merge keeps the people in the order of the fam file. People not in the file keep their sex, plink also
+    # takes M and F.
+    fam = fam.merge(updates, on=['fid', 'iid'], how='left')
+    new_sex = pd.to_numeric(fam['new_sex'].str.upper().replace({'M': '1', 'F': '2'}), errors='coerce').fillna(0)
+    fam['sex'] = new_sex.where(fam['new_sex'].notna(), fam['sex']).astype('int8')
+    genobed.update_fam(geno_name, geno_name + '_SexUpdated', fam.drop(columns='new_sex'))
 
     print("Finished. Your genotype files with sex updated will have the name " + geno_name + "_SexUpdated.")
 
@@ -59,18 +74,19 @@ def file_len(fname):
 
 
 def missing_call_rate(geno_name):
-    # Exclude SNPs (geno) and people (mind) with missing call rates > 10%
-    import subprocess
-    subprocess.check_output([plink, '--bfile', geno_name, '--geno', '0.1', '--make-bed', '--out',
-                             geno_name + '_geno0.1'])
-    if file_len(geno_name + '_geno0.1.bim') < 400000:
+    # Exclude SNPs (geno) and people (mind) with missing call rates > 10%, like running plink --geno 0.1 and then
+    # --mind 0.1. The filters are planned on the dataset (see genoplan) and decided from the QC statistics, so only the
+    # final files are written.
+    import genoplan
+
+    data = genoplan.add(genoplan.dataset(geno_name), 'geno', 0.1)
+    if genoplan.resolve(data)[0].sum() < 400000:
         sys.exit("After running --geno 0.1, you have less than 400,000 variants. This might mean that there are a lot "
                  "of people in your dataset that are missing information and you should run --mind 0.1, then --geno "
                  "0.1. Either way, you should investigate and perform this step on your own, as having too few variants"
                  " will ruin your imputation.")
 
-    subprocess.check_output([plink, '--bfile', geno_name + '_geno0.1', '--mind', '0.1', '--make-bed', '--out',
-                             geno_name + '_geno0.1_mind0.1'])
+    genoplan.write(genoplan.add(data, 'mind', 0.1), geno_name + '_geno0.1_mind0.1')
 
     print("Finished. Your pruned genotype files will have the name " + geno_name + "_geno0.1_mind0.1")
 
@@ -78,13 +94,6 @@ def missing_call_rate(geno_name):
 def het(geno_name):
     # Identifies individuals with extreme heterozygosity values (more than +- 3 SD)
     # Getting extra required modules
-    try:
-        import pandas as pd
-    except (ImportError, ModuleNotFoundError):
-        import genodownload
-        genodownload.getpandas()
-        import pandas as pd
-
     try:
         import numpy as np
     except (ImportError, ModuleNotFoundError):
@@ -92,14 +101,12 @@ def het(geno_name):
         genodownload.getnumpy()
         import numpy as np
 
-    import subprocess
-
-    # Use plink to calculate the heterozygosity, paying attention to geno and mind.
-    subprocess.check_output([plink, '--bfile', geno_name, '--geno', '0.1', '--mind', '0.1', '--het', '--out',
-                             geno_name])
+    import genoplan
 
-    # Read het file into pandas
-    het_file = pd.read_csv(geno_name + '.het', sep='\s+', header=0)
+    # Calculate the heterozygosity, paying attention to geno and mind: like plink --geno 0.1 --mind 0.1 --het, people
+    # with more than 10% missing are removed first, then SNPs with more than 10% missing in the people left, and the
+    # expected homozygosity uses the allele frequencies of the founders left (see genoplan).
+    het_file = genoplan.heterozygosity(genoplan.add_all(genoplan.dataset(geno_name), [('mind', 0.1), ('geno', 0.1)]))
 
     # Create new column with formula: (N(NM)-O(HOM))/N(NM)
     het_file['HET'] = (het_file['N(NM)'] - het_file['O(HOM)']) / het_file['N(NM)']
@@ -122,9 +129,10 @@ def het(geno_name):
     # Write this to file so we have the record.
     het_rem.to_csv(geno_name + '_RemAfterHetCheck.txt', sep='\t', header=True, index=False)
 
-    # Make new plink file with people passing het check.
-    subprocess.check_output([plink, '--bfile', geno_name, '--keep', geno_name + '_KeptAfterHetCheck.txt', '--geno',
-                             '0.1', '--make-bed', '--out', geno_name + '_HetChecked'])
+    # Make new plink files with people passing het check and the SNPs with at most 10% missing in them, written in one
+    # pass over the bed file.
+    data = genoplan.add_all(genoplan.dataset(geno_name), [('keep', het_keep[['FID', 'IID']]), ('geno', 0.1)])
+    genoplan.write(data, geno_name + '_HetChecked')
 
     print("Done. Your new file of people with non-extreme heterozygosity values will be called "
           + geno_name + "_HetChecked")
@@ -0,0 +1,69 @@
+# Compares the bim files of two datasets before merging them with plink, so the merge works the first time instead of
+# rerunning it after every warning or .missnp file. Finds, in one pass over both bim files, the SNPs to flip in the
+# first dataset (alleles on the other strand) and the SNPs to leave out of both (3+ alleles, different positions for
+# the same id, different ids at the same position and duplicate ids).
+try:
+    import pandas as pd
+except (ImportError, ModuleNotFoundError):
+    import genodownload
+    genodownload.getpandas()
+    import pandas as pd
+
+import genobed
+import genovariants
+
+# Plink chromosome names that mean the same chromosome as a number.
+chromosome_codes = genovariants.chromosome_codes
+complement = str.maketrans('ACGT', 'TGCA')
+
+
+def alleles_match(a1, a2, b1, b2):
+    # True where the allele pairs (a1, a2) and (b1, b2) are the same alleles in either order. A '0' allele (missing, or
+    # a monomorphic SNP) matches anything.
+    def same(x, y):
+        return (x == y) | (x == '0') | (y == '0')
+    return (same(a1, b1) & same(a2, b2)) | (same(a1, b2) & same(a2, b1))
+
+
+def reconcile(bim, other_bim):
+    # Returns the ids of the SNPs to flip in bim and the ids of the SNPs to exclude from both datasets.
+    bim = bim.assign(chr=bim['chr'].replace(chromosome_codes))
+    other_bim = other_bim.assign(chr=other_bim['chr'].replace(chromosome_codes))
+
+    # Ids that are in a dataset more than once can't be matched up, and neither can different ids at the same position
+    # (in either dataset or between them).
+    duplicate_ids = genovariants.resolve(genovariants.duplicates([bim, other_bim]))
+
+    # SNPs in both datasets, side by side.
+    both = bim.drop_duplicates('snp', keep=False).merge(other_bim.drop_duplicates('snp', keep=False), on='snp',
+                                                         suffixes=('', '_other'))
+    # The same id at a different position.
+    moved = (both['chr'] != both['chr_other']) | (both['position'] != both['position_other'])
+
+    # Alleles that match as they are, match after flipping to the other strand, or don't match at all (3+ alleles).
+    a1 = both['a1'].str.upper()
+    a2 = both['a2'].str.upper()
+    matched = alleles_match(a1, a2, both['a1_other'].str.upper(), both['a2_other'].str.upper())
+    matched_flipped = alleles_match(a1.str.translate(complement), a2.str.translate(complement),
+                                    both['a1_other'].str.upper(), both['a2_other'].str.upper())
+    flip = both.loc[~moved & ~matched & matched_flipped, 'snp']
+    triallelic = both.loc[~moved & ~matched & ~matched_flipped, 'snp']
+
+    exclude = pd.concat([duplicate_ids, both.loc[moved, 'snp'], triallelic]).drop_duplicates()
+    flip = flip[~flip.isin(exclude)]
+    return flip.reset_index(drop=True), exclude.reset_index(drop=True)
+
+
+def apply(geno_name, out_name, flip, exclude, bim=None):
+    # Write geno_name without the excluded SNPs and with the flip SNPs on the other strand to out_name. Flipping only
+    # changes the alleles in the bim file, so neither step needs plink.
+    if bim is None:
+        bim = genobed.read_bim(geno_name)
+    keep = ~bim['snp'].isin(exclude).values
+    genobed.extract(geno_name, out_name, keep, bim=bim)
+    if len(flip) > 0:
+        kept_bim = bim.loc[keep].copy()
+        to_flip = kept_bim['snp'].isin(flip)
+        kept_bim.loc[to_flip, 'a1'] = kept_bim.loc[to_flip, 'a1'].str.translate(complement)
+        kept_bim.loc[to_flip, 'a2'] = kept_bim.loc[to_flip, 'a2'].str.translate(complement)
+        kept_bim.to_csv(out_name + '.bim', sep='\t', header=False, index=False, float_format='%g')
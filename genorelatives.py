@@ -64,10 +64,25 @@ def update_id(geno_name, update_id_filename):
     #  2) Old IID
     #  3) New FID
     #  4) New IID
-    import subprocess
+    # Only the fam file changes, so it is written in Python and the bed and bim files are linked instead of rewritten.
+    try:
+        import pandas as pd
+    except (ImportError, ModuleNotFoundError):
+        import genodownload
+        genodownload.getpandas()
+        import pandas as pd
+
+    import genobed
 
-    subprocess.check_output([plink, '--bfile', geno_name, '--update-ids', update_id_filename, '--make-bed', '--out',
-                             geno_name + '_IDUpdated'])
+    fam = genobed.read_fam(geno_name)
+    updates = pd.read_csv(update_id_filename, sep='\s+', header=None, usecols=[0, 1, 2, 3],
+                          names=['fid', 'iid', 'new_fid', 'new_iid'], dtype=str).drop_duplicates(['fid', 'iid'],
+                                                                                                 keep='last')
+    # A left merge keeps the people in the order of the fam file. People not in the file keep their ids.
+    fam = fam.merge(updates, on=['fid', 'iid'], how='left')
+    fam['fid'] = fam['new_fid'].fillna(fam['fid'])
+    fam['iid'] = fam['new_iid'].fillna(fam['iid'])
+    genobed.update_fam(geno_name, geno_name + '_IDUpdated', fam.drop(columns=['new_fid', 'new_iid']))
     print("Finished. Your genotype files with the ID updated will have the name " + geno_name + "_IDUpdated")
 
 
@@ -77,8 +92,23 @@ def update_parental(geno_name, update_parents_filename):
     #   2) IID
     #   3) New paternal IID
     #   4) New maternal IID
-    import subprocess
+    # Only the fam file changes, so it is written in Python and the bed and bim files are linked instead of rewritten.
+    try:
+        import pandas as pd
+    except (ImportError, ModuleNotFoundError):
+        import genodownload
+        genodownload.getpandas()
+        import pandas as pd
+
+    import genobed
 
-    subprocess.check_output([plink, '--bfile', geno_name, '--update-parents', update_parents_filename, '--make-bed',
-                             '--out', geno_name + '_ParentsUpdated'])
+    fam = genobed.read_fam(geno_name)
+    updates = pd.read_csv(update_parents_filename, sep='\s+', header=None, usecols=[0, 1, 2, 3],
+                          names=['fid', 'iid', 'new_father', 'new_mother'], dtype=str).drop_duplicates(['fid', 'iid'],
+                                                                                                      keep='last')
+    # A left merge keeps the people in the order of the fam file. People not in the file keep their parents.
+    fam = fam.merge(updates, on=['fid', 'iid'], how='left')
+    fam['father'] = fam['new_father'].fillna(fam['father'])
+    fam['mother'] = fam['new_mother'].fillna(fam['mother'])
+    genobed.update_fam(geno_name, geno_name + '_ParentsUpdated', fam.drop(columns=['new_father', 'new_mother']))
     print("Finished. Your genotype files with parents updated will have the name " + geno_name + "_ParentsUpdated")
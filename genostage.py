@@ -0,0 +1,79 @@
+# Hands genotype files from one step's folder to the next (i.e. into Harmonized_To_1000G and the results back out)
+# without copying them when it can. A reflink (copy on write clone) is tried first, then a hardlink, then, for inputs
+# on another filesystem, a symlink. Copying is the last resort. A link shares its data with the original, so nothing
+# may write into a staged name: genobed writes to a temporary file and moves it into place, and before plink writes
+# to a name that may be a link (i.e. a result staged out by an earlier run), unlink_outputs removes it first.
+import os
+import shutil
+
+# ioctl that clones a whole file on Linux filesystems with copy on write (btrfs, xfs, ...).
+FICLONE = 0x40049409
+
+
+def reflink(source, destination):
+    # Clone source to destination. Raises OSError where the filesystem or platform can't.
+    import fcntl
+
+    with open(source, 'rb') as src, open(destination, 'wb') as dst:
+        try:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+        except OSError:
+            dst.close()
+            os.remove(destination)
+            raise
+    shutil.copystat(source, destination)
+
+
+def stage(source, destination, allow_symlink=True):
+    # Put source at destination (a folder or a file name, like shutil.copy2) and return how: 'same', 'reflink',
+    # 'hardlink', 'symlink' or 'copy'. Symlinks are only used with allow_symlink, since a symlink breaks when the
+    # folder it points into is removed. Results going back to the user should be staged without them.
+    if os.path.isdir(destination):
+        destination = os.path.join(destination, os.path.basename(source))
+    if os.path.exists(destination) and os.path.samefile(source, destination) and \
+            (allow_symlink or not os.path.islink(destination)):
+        return 'same'
+    # Never write through an old link into the file it points to.
+    if os.path.lexists(destination):
+        os.remove(destination)
+
+    try:
+        reflink(source, destination)
+        return 'reflink'
+    except (ImportError, OSError):
+        pass
+    try:
+        os.link(source, destination)
+        return 'hardlink'
+    except (AttributeError, OSError):
+        pass
+    if allow_symlink:
+        try:
+            os.symlink(os.path.abspath(source), destination)
+            return 'symlink'
+        except (AttributeError, NotImplementedError, OSError):
+            pass
+    shutil.copy2(source, destination)
+    return 'copy'
+
+
+def stage_files(geno_name, destination, extensions=('.bed', '.bim', '.fam'), allow_symlink=True):
+    # Stage geno_name's files with the given extensions to the destination folder and report how many bytes didn't
+    # have to be copied. Returns that number.
+    saved = 0
+    for extension in extensions:
+        how = stage(geno_name + extension, destination, allow_symlink)
+        if how != 'copy':
+            saved += os.path.getsize(geno_name + extension)
+    if saved > 0:
+        print('Linked ' + os.path.basename(geno_name) + ' into ' + destination + ' instead of copying it ('
+              + str(round(saved / 1024 ** 2, 1)) + ' MB not copied).')
+    return saved
+
+
+def unlink_outputs(out_name, extensions=('.bed', '.bim', '.fam')):
+    # Remove the files a program is about to write (i.e. plink --make-bed --out out_name). plink truncates files that
+    # are already there, which would change every file linked to them, so it gets new files instead.
+    for extension in extensions:
+        if os.path.lexists(out_name + extension):
+            os.remove(out_name + extension)
@@ -0,0 +1,170 @@
+# QC statistics of a dataset from one pass over its bed file, instead of a plink run (and a new set of plink files)
+# for every check. The pass counts, for each variant, the missing genotypes and the genotypes of founders and of
+# female founders (for allele frequencies and HWE), and for each person the missing genotypes and the observed and
+# expected homozygous genotypes (for heterozygosity of everyone, without a --mind filter; see genoplan.heterozygosity
+# for plink's --mind then --geno order). The counts are saved next to the bed file as <geno_name>.qcstats.npz and
+# reused until the bed, bim or fam file changes, so every QC decision reads the same numbers.
+import os
+
+try:
+    import numpy as np
+except (ImportError, ModuleNotFoundError):
+    import genodownload
+    genodownload.getnumpy()
+    import numpy as np
+
+try:
+    import pandas as pd
+except (ImportError, ModuleNotFoundError):
+    import genodownload
+    genodownload.getpandas()
+    import pandas as pd
+
+import genobed
+
+# Bump when what is saved changes, so older stats files are scanned again.
+stats_version = 3
+
+
+def stats_name(geno_name):
+    return geno_name + '.qcstats.npz'
+
+
+def source_key(geno_name, geno):
+    # Size and modification time of the bed, bim and fam files, and the --geno threshold the per-person counts use.
+    # The modification time is kept to the nanosecond (as whole seconds and nanoseconds, which float64 holds exactly),
+    # so files of the same size rewritten within the same second aren't taken for the old ones.
+    key = [stats_version, geno]
+    for extension in ('.bed', '.bim', '.fam'):
+        stat = os.stat(geno_name + extension)
+        key.extend([stat.st_size, stat.st_mtime_ns // 10 ** 9, stat.st_mtime_ns % 10 ** 9])
+    return np.array(key, dtype=np.float64)
+
+
+def expected_homozygosity(hom_a1, het, hom_a2):
+    # Expected homozygosity of each variant from its founder genotype counts, 1 - 2pq corrected for the number of
+    # founder alleles, like plink --het. NaN for variants without two founder alleles, which plink leaves out.
+    hom_a1 = np.asarray(hom_a1, dtype=np.float64)
+    het = np.asarray(het, dtype=np.float64)
+    alleles = 2 * (hom_a1 + het + np.asarray(hom_a2, dtype=np.float64))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        p = (2 * hom_a1 + het) / alleles
+        expected = 1 - 2 * p * (1 - p) * alleles / (alleles - 1)
+    return np.where(alleles > 1, expected, np.nan)
+
+
+def count_het(block, expected, n_samples, totals):
+    # Add the observed and expected homozygous and the non-missing genotypes of n_samples people in rows of bed bytes
+    # to totals (observed_hom, expected_hom and called_het), using the variants with an expected homozygosity.
+    usable = ~np.isnan(expected)
+    if not usable.all():
+        block = block[usable]
+        expected = expected[usable]
+    totals['observed_hom'] += genobed.sample_counts(block, n_samples, 'hom')
+    # Everyone gets the expected homozygosity of every variant, less that of the variants they are missing.
+    missing_rows, missing_samples = genobed.missing_genotypes(block)
+    totals['expected_hom'] += expected.sum() - np.bincount(missing_samples, weights=expected[missing_rows],
+                                                           minlength=n_samples)
+    totals['called_het'] += len(expected) - np.bincount(missing_samples, minlength=n_samples)
+
+
+def scan(geno_name, geno=0.1, max_bytes=16 * 1024 * 1024):
+    # Count everything in one pass over the bed file, a block of variants (at most max_bytes of the file) at a time.
+    # Genotypes are counted with bit operations on the packed bytes (see genobed.code_counts and sample_counts) and
+    # never unpacked, so memory stays the same for any number of people. Per-person counts only use the variants with
+    # at most a 'geno' fraction missing, like plink --geno before --mind. Heterozygosity counts are for everyone, on
+    # the autosomes passing geno, with allele frequencies from all founders.
+    bim, fam, bed = genobed.open_plink(geno_name)
+    n_samples = len(fam)
+    # Like plink, allele frequencies and HWE only count founders, on chrX the female ones.
+    founders = ((fam['father'] == '0') & (fam['mother'] == '0')).values
+    groups = {'founder': np.flatnonzero(founders), 'female': np.flatnonzero(founders & (fam['sex'] == 2).values)}
+    autosome = pd.to_numeric(bim['chr'], errors='coerce').between(1, 22).values
+
+    stats = {'variant_missing': np.zeros(len(bim), dtype=np.int32)}
+    for group in groups:
+        for genotype in ('hom_a1', 'het', 'hom_a2'):
+            stats[group + '_' + genotype] = np.zeros(len(bim), dtype=np.int32)
+    sample_missing = np.zeros(n_samples, dtype=np.int64)
+    sample_missing_geno = np.zeros(n_samples, dtype=np.int64)
+    het_totals = {'observed_hom': np.zeros(n_samples, dtype=np.int64),
+                  'expected_hom': np.zeros(n_samples, dtype=np.float64),
+                  'called_het': np.zeros(n_samples, dtype=np.int64)}
+    n_geno_variants = 0
+
+    block_size = max(1, min(20000, max_bytes // max(bed.shape[1], 1)))
+    for start in range(0, len(bim), block_size):
+        rows = np.arange(start, min(start + block_size, len(bim)))
+        block = np.asarray(bed[start:start + block_size])
+        everyone = genobed.code_counts(block, n_samples)
+        variant_missing = everyone[1]
+        stats['variant_missing'][rows] = variant_missing
+        for group, people in groups.items():
+            if len(people) == 0:
+                continue
+            if len(people) == n_samples:
+                counts = everyone
+            else:
+                counts = genobed.code_counts(genobed.gather_samples(block, people), len(people))
+            stats[group + '_hom_a1'][rows] = counts[0]
+            stats[group + '_het'][rows] = counts[2]
+            stats[group + '_hom_a2'][rows] = counts[3]
+        missing = genobed.sample_counts(block, n_samples)
+        sample_missing += missing
+
+        # The variants failing geno are few, so their missing calls are taken off instead of counting the rest again.
+        passing = variant_missing <= geno * n_samples
+        n_geno_variants += passing.sum()
+        sample_missing_geno += missing - genobed.sample_counts(block[~passing], n_samples)
+
+        het_rows = passing & autosome[rows]
+        expected = expected_homozygosity(stats['founder_hom_a1'][rows[het_rows]], stats['founder_het'][rows[het_rows]],
+                                         stats['founder_hom_a2'][rows[het_rows]])
+        count_het(block if het_rows.all() else block[het_rows], expected, n_samples, het_totals)
+
+    stats.update(het_totals)
+    stats.update({'sample_missing': sample_missing, 'sample_missing_geno': sample_missing_geno,
+                  'n_geno_variants': np.array(n_geno_variants), 'source': source_key(geno_name, geno)})
+
+    # Write to a temporary file first, so a stats file that exists is always complete even if several jobs scan the
+    # same dataset at once.
+    import tempfile
+    handle, temporary_name = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(geno_name)), suffix='.tmp')
+    with os.fdopen(handle, 'wb') as f:
+        np.savez(f, **stats)
+    os.replace(temporary_name, stats_name(geno_name))
+    return stats
+
+
+def load(geno_name, geno=0.1):
+    # The QC statistics of geno_name, from its stats file if that is current, otherwise from a new scan.
+    if os.path.exists(stats_name(geno_name)):
+        with np.load(stats_name(geno_name)) as saved:
+            if len(saved['source']) == len(source_key(geno_name, geno)) and \
+                    (saved['source'] == source_key(geno_name, geno)).all():
+                return {name: saved[name] for name in saved.files}
+    return scan(geno_name, geno)
+
+
+def hwe_maf(stats, group='founder', variants=None):
+    # HWE exact test p-values and minor allele frequencies from the genotype counts of a group of people ('founder' or
+    # 'female'), for the variants where variants is True (default all of them).
+    import genohwe
+
+    if variants is None:
+        variants = slice(None)
+    hom_a1 = stats[group + '_hom_a1'][variants].astype(np.int64)
+    het = stats[group + '_het'][variants].astype(np.int64)
+    hom_a2 = stats[group + '_hom_a2'][variants].astype(np.int64)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        a1_frq = (2 * hom_a1 + het) / (2 * (hom_a1 + het + hom_a2))
+    return genohwe.hwe_exact(het, hom_a1, hom_a2), np.minimum(a1_frq, 1 - a1_frq)
+
+
+def heterozygosity(stats):
+    # Per-person heterozygosity like a plink .het file from the totals of count_het (i.e. the QC statistics): observed
+    # and expected homozygous genotypes, non-missing genotypes and the F coefficient.
+    with np.errstate(invalid='ignore', divide='ignore'):
+        f = (stats['observed_hom'] - stats['expected_hom']) / (stats['called_het'] - stats['expected_hom'])
+    return pd.DataFrame({'O(HOM)': stats['observed_hom'], 'E(HOM)': stats['expected_hom'],
+                         'N(NM)': stats['called_het'], 'F': f})
@@ -0,0 +1,81 @@
+# Finds duplicate variants across the bim files of everything that is going to be merged (house datasets, batches and
+# the reference) before any genotypes are read, instead of finding them from plink merge warnings after a merge.
+# Chromosomes, positions, alleles and ids are turned into integer codes once (ids with one hash table shared by all
+# datasets), so every check is a hash or sort of integer arrays.
+try:
+    import pandas as pd
+except (ImportError, ModuleNotFoundError):
+    import genodownload
+    genodownload.getpandas()
+    import pandas as pd
+
+try:
+    import numpy as np
+except (ImportError, ModuleNotFoundError):
+    import genodownload
+    genodownload.getnumpy()
+    import numpy as np
+
+# Plink chromosome names that mean the same chromosome as a number.
+chromosome_codes = {'X': '23', 'Y': '24', 'XY': '25', 'MT': '26', 'M': '26'}
+
+
+def recode(values, clean):
+    # Integer codes for values after clean() (i.e. upper case), calling clean() only on the different values, which
+    # for chromosomes and alleles are just a few.
+    codes, uniques = pd.factorize(values)
+    clean_codes = pd.factorize(clean(pd.Series(uniques, dtype=object)))[0]
+    return clean_codes[codes].astype(np.int64), clean_codes.max() + 1 if len(clean_codes) else 1
+
+
+def encode(bims):
+    # Integer codes for the variants of all bims together: dataset number, id, (chromosome, position) and the allele
+    # pair (in either order). Returns a dataframe with one row per variant, in the order of the bims.
+    dataset = np.concatenate([np.full(len(bim), i, dtype=np.int32) for i, bim in enumerate(bims)])
+    positions = np.concatenate([bim['position'].values for bim in bims]).astype(np.int64)
+    id_code = pd.factorize(np.concatenate([bim['snp'].values.astype(object) for bim in bims]))[0].astype(np.int64)
+    chromosome_code = recode(np.concatenate([bim['chr'].values.astype(str).astype(object) for bim in bims]),
+                             lambda x: x.replace(chromosome_codes))[0]
+    allele_codes, n_alleles = recode(np.concatenate([bim['a1'].values.astype(object) for bim in bims] +
+                                                    [bim['a2'].values.astype(object) for bim in bims]),
+                                     lambda x: x.str.upper())
+    a1_code, a2_code = allele_codes[:len(positions)], allele_codes[len(positions):]
+    return pd.DataFrame({'dataset': dataset, 'id': id_code,
+                         # Positions are below 2^32, so the chromosome goes in the bits above them.
+                         'site': (chromosome_code << 32) | positions,
+                         'alleles': np.minimum(a1_code, a2_code) * n_alleles + np.maximum(a1_code, a2_code)})
+
+
+def duplicates(bims, names=None):
+    # Report the variants that can't be merged as they are: ids that are in a dataset more than once ('duplicate_id')
+    # and positions with more than one id, in a dataset or between datasets ('same_position'). The same id at the same
+    # position in different datasets is what merging is for, so that isn't reported. Returns a dataframe with the
+    # dataset name, snp, chr, position, a1, a2 and problem of every reported variant.
+    if names is None:
+        names = [str(i) for i in range(len(bims))]
+    codes = encode(bims)
+
+    # Pairs of codes are put together in one integer, so each check is one hash of an integer array.
+    id_code = codes['id'].values
+    n_ids = id_code.max() + 1 if len(id_code) else 1
+    duplicate_id = pd.Series(codes['dataset'].values * n_ids + id_code).duplicated(keep=False).values
+    # Count the different ids at each position, using each (position, id) pair once.
+    site_code = pd.factorize(codes['site'].values)[0].astype(np.int64)
+    first_pair = ~pd.Series(site_code * n_ids + id_code).duplicated().values
+    same_position = np.bincount(site_code[first_pair], minlength=site_code.max() + 1 if len(site_code) else 0)[
+        site_code] > 1
+
+    rows = np.flatnonzero(duplicate_id | same_position)
+    variants = pd.concat(bims, ignore_index=True).iloc[rows]
+    report = pd.DataFrame({'dataset': np.asarray(names, dtype=object)[codes['dataset'].values[rows]],
+                           'snp': variants['snp'].values, 'chr': variants['chr'].values,
+                           'position': variants['position'].values, 'a1': variants['a1'].values,
+                           'a2': variants['a2'].values,
+                           'problem': np.where(duplicate_id[rows], 'duplicate_id', 'same_position')})
+    return report
+
+
+def resolve(report):
+    # The ids to leave out of every dataset so that the merge has no duplicates: all the variants in the report, since
+    # there's no way to tell which of the copies is right.
+    return report['snp'].drop_duplicates().reset_index(drop=True)
@@ -0,0 +1,149 @@
+# Works with the 1000G reference vcf files. GenotypeHarmonizer reads the whole vcf file of a chromosome (2,504 people
+# at every 1000G site) even though a genotyping array only has a few percent of those sites. reference_slice() cuts
+# the reference down to the study positions with bcftools, using the tabix index so only the parts of the file at those
+# positions are read, and caches the slice so later runs with the same SNPs reuse it. filter_records() does the same for
+# merging with 1000G without bcftools, streaming the vcf file and keeping only the records of the SNPs to merge.
+import os
+import shutil
+import hashlib
+import subprocess
+from os.path import expanduser
+
+try:
+    import numpy as np
+except (ImportError, ModuleNotFoundError):
+    import genodownload
+    genodownload.getnumpy()
+    import numpy as np
+
+import genobed
+
+home = expanduser("~")
+bindir = os.path.join(home, 'software', 'bin')
+
+
+def find_bcftools():
+    # bcftools from ~/software/bin (where genodownload puts it) or the PATH, None if there isn't one.
+    if os.path.exists(os.path.join(bindir, 'bcftools')):
+        return os.path.join(bindir, 'bcftools')
+    return shutil.which('bcftools')
+
+
+def slice_dirs(vcf_file):
+    # Folders that can hold the slices of the reference vcf files: next to them like the legend cache, or in the working
+    # folder (Harmonized_To_1000G when harmonizing) for a shared copy of the reference that is read only.
+    return [os.path.join(os.path.dirname(os.path.abspath(vcf_file)), 'Reference_Slices'),
+            os.path.join(os.getcwd(), 'Reference_Slices')]
+
+
+def slice_dir(vcf_file):
+    # Folder new slices are written to, made if it isn't there: the first of slice_dirs that can be written to.
+    for folder in slice_dirs(vcf_file):
+        try:
+            os.makedirs(folder, exist_ok=True)
+        except OSError:
+            continue
+        if os.access(folder, os.W_OK):
+            return folder
+    raise OSError('No folder to write the reference slices of ' + vcf_file + ' to: ' + ', '.join(slice_dirs(vcf_file)))
+
+
+def position_hash(vcf_file, chromosomes, positions, window):
+    # Key of a slice: the sorted set of study positions, the window around them and the reference file it was cut from
+    # (name, size and modification time, so a new download makes new slices).
+    md5 = hashlib.md5()
+    for chromosome in np.unique(chromosomes):
+        md5.update(str(chromosome).encode() + b'\0')
+        md5.update(np.unique(positions[chromosomes == chromosome]).astype('<i8').tobytes())
+    stat = os.stat(vcf_file)
+    md5.update(('%s %d %d %d' % (os.path.basename(vcf_file), stat.st_size, int(stat.st_mtime), window)).encode())
+    return md5.hexdigest()
+
+
+def regions(chromosomes, positions, window=0):
+    # Regions (chromosome, start, end) covering each position +/- window. Overlapping regions are merged so that no
+    # reference variant is written twice.
+    rows = []
+    for chromosome in np.unique(chromosomes):
+        chromosome_positions = np.unique(positions[chromosomes == chromosome])
+        starts = np.maximum(chromosome_positions - window, 1)
+        ends = chromosome_positions + window
+        # A new region starts wherever a window doesn't touch the end of the one before it.
+        new_region = np.ones(len(starts), dtype=bool)
+        new_region[1:] = starts[1:] > ends[:-1] + 1
+        region_starts = starts[new_region]
+        region_ends = np.maximum.reduceat(ends, np.flatnonzero(new_region))
+        rows.extend(zip([chromosome] * len(region_starts), region_starts, region_ends))
+    return rows
+
+
+def reference_slice(vcf_file, geno_name, window=0):
+    # Returns a bgzipped, tabix indexed vcf file with only the reference variants at the positions in geno_name's bim
+    # file, to give to GenotypeHarmonizer instead of vcf_file. GenotypeHarmonizer only compares variants that are in
+    # both the study and the reference (also for its LD checks), so the study positions are all it needs. window adds
+    # that many bp around each position. Falls back to the full vcf_file if bcftools isn't there.
+    bcftools = find_bcftools()
+    bim_file = genobed.read_bim(geno_name)
+    if bcftools is None or len(bim_file) == 0 or not os.path.exists(vcf_file + '.tbi'):
+        return vcf_file
+
+    chromosomes = bim_file['chr'].values.astype(str)
+    positions = bim_file['position'].values
+    key = position_hash(vcf_file, chromosomes, positions, window)
+    base_name = os.path.basename(vcf_file).replace('.vcf.gz', '') + '_' + key[:16] + '.vcf.gz'
+    # Reuse the slice from an earlier run. The index is written last, so a slice with an index is complete.
+    for folder in slice_dirs(vcf_file):
+        if os.path.exists(os.path.join(folder, base_name + '.tbi')):
+            return os.path.join(folder, base_name)
+
+    slice_name = os.path.join(slice_dir(vcf_file), base_name)
+    regions_name = slice_name.replace('.vcf.gz', '_Regions.txt')
+    with open(regions_name, 'w') as f:
+        for chromosome, start, end in regions(chromosomes, positions, window):
+            f.write(chromosome + '\t' + str(start) + '\t' + str(end) + '\n')
+
+    # Write to a temporary name first, so an interrupted run never leaves a slice that looks finished.
+    subprocess.check_output([bcftools, 'view', '-R', regions_name, '-Oz', '-o', slice_name + '.tmp', vcf_file])
+    os.replace(slice_name + '.tmp', slice_name)
+    subprocess.check_output([bcftools, 'index', '-t', slice_name])
+    os.remove(regions_name)
+    return slice_name
+
+
+def is_gzip(file_name):
+    # True if the file starts with the gzip magic bytes (bgzip files do too).
+    with open(file_name, 'rb') as f:
+        return f.read(2) == b'\x1f\x8b'
+
+
+def filter_records(vcf_file, out_file, snp_ids=None, buffer_size=16 * 1024 * 1024):
+    # Stream vcf_file (gzipped or not) and write its header and only the records with an ID in snp_ids to out_file, so
+    # plink parses the few records it needs instead of the whole file. Like plink --extract, only the ID is matched,
+    # not the position. snp_ids can be None to keep every record, and is kept as a set of bytes. out_file is gzipped
+    # at the fastest level when its name ends with .gz (plink --vcf reads it as it is), so the filtered records of
+    # several chromosomes don't take many GB of disk at once. Only the first three columns of a record are looked at,
+    # straight from the bytes, so the genotypes of the records that are skipped are never split up. Memory doesn't grow
+    # with the size of vcf_file. Returns the number of records written.
+    import io
+    import gzip
+    import functools
+
+    if snp_ids is not None:
+        snp_ids = set(snp_id.encode() if isinstance(snp_id, str) else snp_id for snp_id in snp_ids)
+
+    opener = gzip.open if is_gzip(vcf_file) else open
+    written = 0
+    out_opener = functools.partial(gzip.open, compresslevel=1) if out_file.endswith('.gz') else open
+    with opener(vcf_file, 'rb') as raw, out_opener(out_file, 'wb') as out:
+        vcf = io.BufferedReader(raw, buffer_size) if opener is gzip.open else raw
+        for line in vcf:
+            if line.startswith(b'#'):
+                out.write(line)
+                continue
+            if snp_ids is not None:
+                id_start = line.find(b'\t', line.find(b'\t') + 1) + 1
+                if line[id_start:line.find(b'\t', id_start)] not in snp_ids:
+                    continue
+            out.write(line)
+            written += 1
+    return written
@@ -0,0 +1,26 @@
+# The geno modules are plain scripts in the folder above, not a package.
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import genobed
+
+
+@pytest.fixture
+def write_plink(tmp_path):
+    # Write a small plink dataset from a (variants x samples) int8 array of A1 allele counts (-1 missing) and return
+    # its name. fam rows are (fid, iid, father, mother, sex); bim rows are (chr, snp, position, a1, a2).
+    def write(name, dosage, fam, bim):
+        geno_name = str(tmp_path / name)
+        genobed.write_bed(geno_name, [np.asarray(dosage, dtype=np.int8)])
+        pd.DataFrame([row[:2] + ('0',) + row[2:] for row in bim]).to_csv(geno_name + '.bim', sep='\t', header=False,
+                                                                         index=False)
+        pd.DataFrame([tuple(row) + ('-9',) for row in fam]).to_csv(geno_name + '.fam', sep=' ', header=False,
+                                                                   index=False)
+        return geno_name
+    return write
@@ -0,0 +1,13 @@
+import numpy as np
+
+import genoafcheck
+
+
+def test_position_join_casts_study_positions_to_the_reference_dtype():
+    # The legend cache stores int32 positions and bim positions are int64. 100 is split over two reference rows, and
+    # 2**32 + 100 would match 100 if it wrapped around when cast.
+    reference_positions = np.array([50, 100, 100, 300], dtype=np.int32)
+    study_positions = np.array([100, 2 ** 32 + 100, 300, 75], dtype=np.int64)
+    study_rows, reference_rows = genoafcheck.position_join(study_positions, reference_positions)
+    assert study_rows.tolist() == [0, 0, 2]
+    assert reference_rows.tolist() == [1, 2, 3]
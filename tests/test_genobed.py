@@ -0,0 +1,77 @@
+import numpy as np
+
+import genobed
+
+
+def test_allele_frequencies_count_founders_only(write_plink):
+    # A trio: both parents are homozygous A1 and the child is heterozygous. Like plink --freq, only the parents count.
+    geno_name = write_plink('trio', [[2, 2, 1]],
+                            [('f', 'dad', '0', '0', 1), ('f', 'mom', '0', '0', 2), ('f', 'kid', 'dad', 'mom', 1)],
+                            [('1', 'rs1', 100, 'A', 'G')])
+    a1_frq, a2_frq, observations = genobed.allele_frequencies(geno_name)
+    assert a1_frq[0] == 1
+    assert observations[0] == 4
+
+
+def test_rewriting_a_linked_output_keeps_the_source(write_plink):
+    geno_name = write_plink('data', [[2, 1, 0], [0, -1, 2]],
+                            [('f1', 'a', '0', '0', 1), ('f2', 'b', '0', '0', 2), ('f3', 'c', '0', '0', 1)],
+                            [('1', 'rs1', 100, 'A', 'G'), ('1', 'rs2', 200, 'C', 'T')])
+    with open(geno_name + '.bed', 'rb') as f:
+        source_bed = f.read()
+    with open(geno_name + '.bim', 'rb') as f:
+        source_bim = f.read()
+
+    # update_fam links the bed and bim files, then a rerun writes a subset to the same name.
+    out_name = geno_name + '_Out'
+    genobed.update_fam(geno_name, out_name, genobed.read_fam(geno_name))
+    genobed.subset(geno_name, out_name, variants=[1], samples=[0, 2])
+
+    with open(geno_name + '.bed', 'rb') as f:
+        assert f.read() == source_bed
+    with open(geno_name + '.bim', 'rb') as f:
+        assert f.read() == source_bim
+    assert len(genobed.read_bim(out_name)) == 1
+
+
+def test_failed_write_leaves_the_old_file(write_plink):
+    geno_name = write_plink('data', [[2, 1, 0]], [('f1', 'a', '0', '0', 1), ('f2', 'b', '0', '0', 2),
+                                                  ('f3', 'c', '0', '0', 1)], [('1', 'rs1', 100, 'A', 'G')])
+    with open(geno_name + '.bed', 'rb') as f:
+        old_bed = f.read()
+
+    def blocks():
+        yield np.array([[0, 1, 2]], dtype=np.int8)
+        raise RuntimeError('stopped')
+
+    try:
+        genobed.write_bed(geno_name, blocks())
+    except RuntimeError:
+        pass
+    with open(geno_name + '.bed', 'rb') as f:
+        assert f.read() == old_bed
+
+
+def test_merge_samples_swaps_crossed_alleles_next_to_missing(write_plink):
+    # rs1 is monomorphic in both datasets, 0/G in the first and G/0 in the second, so the second has to be swapped.
+    first = write_plink('first', [[0, 0]], [('f1', 'a', '0', '0', 1), ('f2', 'b', '0', '0', 2)],
+                        [('1', 'rs1', 100, '0', 'G')])
+    second = write_plink('second', [[2, 2]], [('f3', 'c', '0', '0', 1), ('f4', 'd', '0', '0', 2)],
+                         [('1', 'rs1', 100, 'G', '0')])
+    out_name = first + '_Merged'
+    assert genobed.merge_samples([first, second], out_name)
+
+    bim, fam, bed = genobed.open_plink(out_name)
+    assert list(bim[['a1', 'a2']].values[0]) == ['0', 'G']
+    assert genobed.dosages(bed, len(fam)).tolist() == [[0, 0, 0, 0]]
+
+
+def test_join_tables_keeps_the_exact_text(tmp_path):
+    names = []
+    for i, row in enumerate(['rs1\t0.38912466843501325\n', 'rs2\t1e-05\n']):
+        names.append(str(tmp_path / ('chr%d.txt' % (i + 1))))
+        with open(names[-1], 'w') as f:
+            f.write('SNP\tdataset_a1_frq\n' + row)
+    genobed.join_tables(names, str(tmp_path / 'all.txt'))
+    with open(str(tmp_path / 'all.txt')) as f:
+        assert f.read() == 'SNP\tdataset_a1_frq\nrs1\t0.38912466843501325\nrs2\t1e-05\n'
@@ -0,0 +1,30 @@
+import os
+import subprocess
+
+import genoharmonize
+import genostats
+
+
+def test_cluster_scans_the_stats_in_a_job(write_plink, tmp_path, monkeypatch):
+    # The stats scan runs in its own job that the array waits for, not on the node the jobs are submitted from.
+    write_plink('study', [[0, 1, 2]], [('f' + str(i), 'i' + str(i), '0', '0', 1) for i in range(3)],
+                            [('1', 'rs1', 100, 'A', 'G')])
+    submitted = []
+
+    def qsub(args):
+        submitted.append(args)
+        return ('job' + str(len(submitted)) + '\n').encode()
+
+    def load(*args, **kwargs):
+        raise AssertionError('the bed file was scanned before qsub')
+
+    monkeypatch.setattr(subprocess, 'check_output', qsub)
+    monkeypatch.setattr(genostats, 'load', load)
+    monkeypatch.chdir(tmp_path)
+
+    genoharmonize.cluster('study', 'alloc', 'harmonizer.jar', 'vcf', 'legend', 'ref.fasta')
+
+    assert os.path.exists(str(tmp_path / 'Harmonized_To_1000G' / 'study_HarmonizeTo1000G_Stats.pbs'))
+    assert submitted == [['qsub', 'study_HarmonizeTo1000G_Stats.pbs'],
+                         ['qsub', '-W', 'depend=afterok:job1', 'study_HarmonizeTo1000G.pbs'],
+                         ['qsub', '-W', 'depend=afterokarray:job2', 'study_HarmonizeTo1000G_Finish.pbs']]
@@ -0,0 +1,24 @@
+import gzip
+import os
+
+import genolegend
+
+
+def test_cache_goes_to_the_working_folder_when_the_legends_are_read_only(tmp_path, monkeypatch):
+    reference, work = tmp_path / 'reference', tmp_path / 'work'
+    reference.mkdir()
+    work.mkdir()
+    legend_file_name = '1000GP_Phase3_chr1.legend.gz'
+    with gzip.open(str(reference / legend_file_name), 'wt') as f:
+        f.write('id position a0 a1 TYPE AFR AMR EAS EUR SAS ALL\n'
+                'rs1:100:A:G 100 A G Biallelic_SNP 0.1 0.2 0.3 0.4 0.5 0.3\n')
+    monkeypatch.chdir(work)
+
+    # Checked through os.access, since chmod doesn't stop root from writing.
+    access = os.access
+    monkeypatch.setattr(os, 'access', lambda path, mode: not path.startswith(str(reference)) and access(path, mode))
+    legend = genolegend.load(str(reference), legend_file_name)
+    assert legend['position'].tolist() == [100]
+    cache = str(work / 'Legend_Cache' / '1000GP_Phase3_chr1')
+    assert os.path.exists(os.path.join(cache, 'source.json'))
+    assert genolegend.current_cache(str(reference), legend_file_name) == cache
@@ -0,0 +1,25 @@
+import os
+
+import genomerge
+import genopanel
+
+
+def test_panel_is_built_where_it_can_be_written(tmp_path, monkeypatch):
+    vcf_path, work, shared = tmp_path / 'vcf', tmp_path / 'work', tmp_path / 'shared'
+    vcf_path.mkdir()
+    work.mkdir()
+    for vcf_file_name in genopanel.vcf_file_names:
+        (vcf_path / vcf_file_name).write_bytes(b'')
+    monkeypatch.chdir(work)
+    monkeypatch.setattr(genomerge, 'vcf_to_bed', lambda vcf_file, out_name, *args: open(out_name + '.bed', 'w').close())
+
+    # Checked through os.access, since chmod doesn't stop root from writing.
+    access = os.access
+    monkeypatch.setattr(os, 'access', lambda path, mode: not path.startswith(str(vcf_path)) and access(path, mode))
+    assert genopanel.build(str(vcf_path), panel_path=str(shared)) == str(shared)
+    assert os.path.exists(str(shared / 'chr23_1000G_Phase3.bed'))
+    assert genopanel.current_panel(str(vcf_path), str(shared)) == str(shared)
+
+    # Without a folder for the panel, a read only vcf folder puts it in the working folder.
+    assert genopanel.build(str(vcf_path)) == str(work / '1000G_Panel')
+    assert genopanel.current_panel(str(vcf_path)) == str(work / '1000G_Panel')
@@ -0,0 +1,25 @@
+import genoplinklog
+
+
+def test_same_position_warning_names_both_variants():
+    warning = genoplinklog.parse_line("Warning: Variants 'rs1' and 'rs2' have the same position.\n")
+    assert warning.kind == 'same_position'
+    assert (warning.variant, warning.other_variant) == ('rs1', 'rs2')
+
+
+def test_hh_warning_keeps_its_file():
+    warning = genoplinklog.parse_line("Warning: 12 het. haploid genotypes present (see 1000G_Phase3.hh ); many "
+                                      "commands treat these as missing.\n")
+    assert warning.file == '1000G_Phase3.hh'
+    assert warning.variant is None
+
+
+def test_read_warnings_skips_other_lines(tmp_path):
+    log_name = str(tmp_path / 'merge.log')
+    with open(log_name, 'w') as f:
+        f.write("3 variants loaded from .bim file.\n"
+                "Warning: Multiple positions seen for variant 'rs3'.\n"
+                "Warning: Variants 'rs1' and 'rs2' have the same position.\n")
+    warnings = genoplinklog.read_warnings(log_name)
+    assert list(warnings['kind']) == ['multiple_positions', 'same_position']
+    assert list(warnings['other_variant'].fillna('')) == ['', 'rs2']
@@ -0,0 +1,17 @@
+import genostage
+
+
+def test_rerun_does_not_change_the_source(tmp_path):
+    source = tmp_path / 'data.bed'
+    source.write_bytes(b'original')
+    out_name = str(tmp_path / 'result')
+
+    # The first run links the source in as its result, the rerun writes its own result to the same name.
+    genostage.stage(str(source), out_name + '.bed', allow_symlink=False)
+    genostage.stage(str(source), out_name + '.bed', allow_symlink=False)
+    genostage.unlink_outputs(out_name)
+    with open(out_name + '.bed', 'wb') as f:
+        f.write(b'rerun')
+
+    assert source.read_bytes() == b'original'
+    assert (tmp_path / 'result.bed').read_bytes() == b'rerun'
@@ -0,0 +1,52 @@
+import os
+
+import numpy as np
+
+import genoplan
+import genostats
+
+
+def test_female_counts_are_founders_only(write_plink):
+    # Mother and daughter are both female, only the mother is a founder, like plink --hardy.
+    geno_name = write_plink('trio', [[2, 2, 0]],
+                            [('f', 'dad', '0', '0', 1), ('f', 'mom', '0', '0', 2), ('f', 'kid', 'dad', 'mom', 2)],
+                            [('X', 'rs1', 100, 'A', 'G')])
+    stats = genostats.scan(geno_name)
+    assert (stats['female_hom_a1'][0], stats['female_het'][0], stats['female_hom_a2'][0]) == (1, 0, 0)
+
+
+def test_heterozygosity_runs_mind_before_geno(write_plink):
+    rng = np.random.RandomState(1)
+    dosage = rng.randint(0, 3, (20, 6)).astype(np.int8)
+    # The first person misses 25% of the variants and fails mind. The first variant is only missing in that person, so
+    # it fails geno if geno comes first, but passes once the person is gone.
+    dosage[:5, 0] = -1
+    fam = [('f%d' % i, 'i%d' % i, '0', '0', 1) for i in range(5)] + [('f5', 'i5', 'i1', 'i2', 2)]
+    geno_name = write_plink('data', dosage, fam, [('1', 'rs%d' % i, 100 * i, 'A', 'G') for i in range(20)])
+
+    het = genoplan.heterozygosity(genoplan.add_all(genoplan.dataset(geno_name), [('mind', 0.1), ('geno', 0.1)]))
+
+    # plink --mind 0.1 --geno 0.1 --het: frequencies from the founders left (people 1 to 4) on all 20 variants.
+    kept = dosage[:, 1:]
+    founders = kept[:, :4]
+    alleles = 2 * 4
+    p = founders.sum(axis=1) / alleles
+    expected = 1 - 2 * p * (1 - p) * alleles / (alleles - 1)
+    assert list(het['IID']) == ['i1', 'i2', 'i3', 'i4', 'i5']
+    assert (het['N(NM)'] == 20).all()
+    assert (het['O(HOM)'].values == (kept != 1).sum(axis=0)).all()
+    assert np.allclose(het['E(HOM)'], expected.sum())
+
+
+def test_rewrite_within_the_same_second_is_scanned_again(write_plink):
+    fam = [('f' + str(i), 'i' + str(i), '0', '0', 1) for i in range(4)]
+    bim = [('1', 'rs1', 100, 'A', 'G')]
+    geno_name = write_plink('data', [[2, 2, 2, 2]], fam, bim)
+    second = 1700000000 * 10 ** 9
+    os.utime(geno_name + '.bed', ns=(second + 100, second + 100))
+    assert genostats.load(geno_name)['founder_hom_a1'][0] == 4
+
+    # Same size, and the same modification time in whole seconds.
+    write_plink('data', [[0, 0, 0, 0]], fam, bim)
+    os.utime(geno_name + '.bed', ns=(second + 200, second + 200))
+    assert genostats.load(geno_name)['founder_hom_a1'][0] == 0
@@ -0,0 +1,31 @@
+import gzip
+import os
+
+import genovcf
+
+
+def test_slices_go_to_the_working_folder_when_the_reference_is_read_only(tmp_path, monkeypatch):
+    reference, work = tmp_path / 'reference', tmp_path / 'work'
+    reference.mkdir()
+    work.mkdir()
+    vcf_file = str(reference / 'ALL.chr1.vcf.gz')
+    monkeypatch.chdir(work)
+    assert genovcf.slice_dir(vcf_file) == str(reference / 'Reference_Slices')
+
+    # Checked through os.access, since chmod doesn't stop root from writing.
+    access = os.access
+    monkeypatch.setattr(os, 'access', lambda path, mode: not path.startswith(str(reference)) and access(path, mode))
+    assert genovcf.slice_dir(vcf_file) == str(work / 'Reference_Slices')
+    assert os.path.isdir(str(work / 'Reference_Slices'))
+
+
+def test_filter_records_matches_ids_only_and_gzips(tmp_path):
+    vcf_file = str(tmp_path / 'chr1.vcf')
+    with open(vcf_file, 'w') as f:
+        f.write('##fileformat=VCFv4.1\n#CHROM\tPOS\tID\tREF\tALT\n'
+                '1\t100\trs1\tA\tG\n1\t200\trs2\tC\tT\n1\t300\trs3\tG\tA\n')
+    out_file = str(tmp_path / 'chr1_Filtered.vcf.gz')
+    # rs3 is kept wherever it is, like plink --extract.
+    assert genovcf.filter_records(vcf_file, out_file, ['rs1', 'rs3']) == 2
+    with gzip.open(out_file, 'rt') as f:
+        assert f.read() == '##fileformat=VCFv4.1\n#CHROM\tPOS\tID\tREF\tALT\n1\t100\trs1\tA\tG\n1\t300\trs3\tG\tA\n'